@@ -25,7 +25,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(AbstractTemplate)
 class AbstractTemplateAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'reference', 'image', 'created_at', 'updated_at']
+    list_display = ['id', 'name', 'reference', 'image', 'version', 'created_at', 'updated_at']
     search_fields = ['name', 'reference']
     list_filter = ['created_at', 'updated_at']
     ordering = ['name']
@@ -292,7 +292,7 @@ class CreditActionAdmin(admin.ModelAdmin):
 
 @admin.register(KeywordLocationCombination)
 class KeywordLocationCombinationAdmin(admin.ModelAdmin):
-    list_display = ['keyword', 'location', 'is_scraped']
+    list_display = ['keyword', 'location', 'is_scraped', 'scrape_cursor', 'failed_attempts']
 
 
 @admin.register(Favorite)
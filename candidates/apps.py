@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CandidatesConfig(AppConfig):
@@ -6,4 +7,11 @@ class CandidatesConfig(AppConfig):
     name = 'candidates'
 
     def ready(self):
-        import candidates.signals
\ No newline at end of file
+        import candidates.signals
+
+        if settings.CHROME_POOL_WARM_ON_BOOT:
+            from .utils import ensure_chromedriver
+            try:
+                ensure_chromedriver()
+            except Exception as e:
+                print(f"Error installing chromedriver: {e}")
@@ -23,6 +23,59 @@ POPULAR_WEBSITES = [
     "https://www.bbc.com",
 ]
 BATCH_SIZE = 5
+SEARCH_PAGE_SIZE = 25
+SEARCH_PAGE_CONCURRENCY = 3
+JOB_DETAIL_CONCURRENCY = 10
+SCRAPED_JOB_INDEX_BLOOM_THRESHOLD = 2000000
+SCRAPED_JOB_INDEX_ERROR_RATE = 0.001
+JOB_MATCH_TOP_K = 500
+JOB_MATCH_LLM_RESCORE_TOP_K = 10
+JOB_MATCH_CHUNK_SIZE = 2000
+SCORING_PROMPT_TOKEN_BUDGET = 24000
+SCORING_ACTIVE_CANDIDATE_DAYS = 30
+SCRAPING_CLAIM_TIMEOUT_MINUTES = 60
+SCRAPING_RUN_TIMEOUT_HOURS = 6
+SCRAPING_MAX_FAILED_ATTEMPTS = 3
+SCRAPE_RETRY_BUDGET = 2000
+SCRAPE_MAX_ATTEMPTS = 12
+SCRAPE_MAX_SOFT_FAILURES = 8
+PROXY_POOL_REFRESH_INTERVAL = 300
+PROXY_POOL_MAX_SIZE = 100
+PROXY_POOL_MAX_FAILURES = 3
+PROXY_FANOUT = 10
+JOB_LINK_FETCH_DEADLINE = 20
+JOB_LINK_HEDGE_DELAY = 1.5
+JOB_LINK_ATTEMPT_TIMEOUT = 8
+CHROME_POOL_MAX_RENDERS = 50
+CHROME_POOL_ACQUIRE_TIMEOUT = 60
+CV_RENDER_DEBOUNCE_SECONDS = 2
+CV_RENDER_STALE_MINUTES = 10
+CV_RENDER_ENGINE_VERSION = 1
+CV_THUMBNAIL_PRESETS = {"small": 300, "medium": 600, "large": 1200}  # Thumbnail widths in px
+CV_DOWNLOAD_URL_EXPIRY = 300  # Seconds a presigned download link stays valid
+CV_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PROFILE_PICTURE_SIZES = [64, 128, 256]  # Square avatar renditions in px
+PROFILE_PICTURE_DEFAULT_SIZE = 256
+PROFILE_PICTURE_CACHE_CONTROL = "public, max-age=31536000, immutable"  # Rendition names change with the content
+# (template settings key, CVData field) pairs rendered as entry lists / tag lists by the native backend
+CV_RENDER_ENTRY_SECTIONS = [
+    ("experience", "work"),
+    ("education", "educations"),
+    ("projects", "projects"),
+    ("certifications", "certifications"),
+    ("volunteering", "volunteering"),
+    ("references", "references"),
+]
+CV_RENDER_TAG_SECTIONS = [
+    ("skills", "skills"),
+    ("languages", "languages"),
+    ("social", "social"),
+    ("interests", "interests"),
+]
+CV_ENTRY_HEADING_KEYS = ["title", "job_title", "degree", "name", "certification", "project", "organization"]
+CV_ENTRY_SUBHEADING_KEYS = ["company_name", "company", "institution", "school", "issuer", "location", "city"]
+CV_ENTRY_BODY_KEYS = ["responsibilities", "description", "summary", "details", "contact"]
+CV_TAG_KEYS = ["skill", "language", "interest", "name"]
 
 DEFAULT_TEMPLATE_DATA = {
     'language': 'fr',
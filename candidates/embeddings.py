@@ -0,0 +1,108 @@
+import hashlib
+import math
+import re
+import numpy as np
+
+
+EMBEDDING_DIM = 512
+TOKEN_PATTERN = re.compile(r"[^\W_]{2,}", re.UNICODE)
+STOP_WORDS = {
+    # English
+    "the", "and", "for", "with", "you", "your", "our", "are", "will", "that", "this", "from", "have", "has",
+    "was", "were", "not", "but", "all", "can", "who", "what", "their", "they", "them", "his", "her", "its",
+    "into", "about", "more", "other", "such", "than", "also", "any", "each", "per", "via", "etc", "job",
+    "of", "to", "in", "on", "at", "by", "an", "or", "as", "is", "be", "we", "it", "if", "so",
+    # French
+    "les", "des", "une", "pour", "dans", "sur", "avec", "par", "est", "sont", "vous", "nous", "votre", "notre",
+    "vos", "nos", "aux", "qui", "que", "quoi", "ses", "son", "sa", "leur", "leurs", "plus", "mais", "ou",
+    "et", "de", "du", "la", "le", "un", "en", "au", "ce", "ces", "cette", "il", "elle", "ils", "ne", "pas",
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+def flatten_text(value):
+    """
+    Collects every string found in a (possibly nested) JSON value.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in flatten_text(item)]
+    if isinstance(value, (list, tuple)):
+        return [text for item in value for text in flatten_text(item)]
+    return [str(value)]
+
+
+def embed_text(text):
+    """
+    Hashed sublinear term-frequency vector of a text. IDF weighting is applied at ranking
+    time, once document frequencies over the whole Job table are known.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    counts = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    for token, count in counts.items():
+        bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+        vector[bucket % EMBEDDING_DIM] += 1 + math.log(count)
+    return vector
+
+
+def job_embedding_text(title, description, requirements, skills_required):
+    # Title repeated so it weighs more than the long description
+    parts = [title or "", title or "", description or ""]
+    parts += flatten_text(requirements)
+    parts += flatten_text(skills_required)
+    return "\n".join(parts)
+
+
+def embed_job(job):
+    """
+    Returns the serialized embedding of a Job instance.
+    """
+    text = job_embedding_text(job.title, job.description, job.requirements, job.skills_required)
+    return embed_text(text).tobytes()
+
+
+def embed_candidate_profile(candidate_profile):
+    """
+    Embeds the serialized CVDataSerializer payload of a CV.
+    """
+    profile = dict(candidate_profile or {})
+    title = profile.get("title") or ""
+    return embed_text("\n".join([title, title] + flatten_text(profile)))
+
+
+def vector_from_bytes(value):
+    if not value:
+        return np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    return np.frombuffer(bytes(value), dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def compute_idf(document_frequencies, total_documents):
+    return (np.log((1.0 + total_documents) / (1.0 + document_frequencies)) + 1.0).astype(np.float32)
+
+
+def merge_top_k(best_scores, best_ids, chunk_scores, chunk_ids, top_k):
+    """
+    Merges the cosine scores of a job chunk into the running per-candidate top-K.
+    best_scores/best_ids are (candidates, <=top_k) arrays, chunk_scores is (candidates, chunk).
+    """
+    tiled_ids = np.broadcast_to(chunk_ids, chunk_scores.shape)
+    scores = np.concatenate([best_scores, chunk_scores], axis=1)
+    ids = np.concatenate([best_ids, tiled_ids], axis=1)
+    if scores.shape[1] <= top_k:
+        return scores, ids
+    keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(ids, keep, axis=1)
@@ -0,0 +1,250 @@
+import asyncio
+import random
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+import aiohttp
+import requests
+
+
+SUCCESS = "success"
+THROTTLED = "throttled"
+SOFT_FAILURE = "soft_failure"
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+THROTTLE_STATUSES = {429, 999}
+FATAL_STATUSES = {400, 404, 410}
+
+# Hosts are few, but every proxy the pool rotates through gets its own state
+MAX_HOST_STATES = 1024
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def classify_response(status, text, marker):
+    """
+    Classifies a fetch outcome. A 200 without the marker is LinkedIn serving its sign-in wall
+    or an empty shell: worth a few retries, but not as many as a network error.
+    """
+    if status == 200 and marker in (text or ""):
+        return SUCCESS
+    if status in THROTTLE_STATUSES:
+        return THROTTLED
+    if status in FATAL_STATUSES:
+        return FATAL
+    if status == 200:
+        return SOFT_FAILURE
+    return RETRYABLE
+
+
+class HostState:
+    """
+    Adaptive token bucket and circuit breaker for one host (or one proxy egress).
+
+    The refill rate grows additively on success and is halved on 429/999, so throughput settles
+    at what the host tolerates. Consecutive failures open the circuit for a cooldown that
+    doubles every time a half-open probe fails.
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.1, max_rate=10.0, failure_threshold=8, cooldown=30.0, max_cooldown=600.0):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.half_open = False
+
+    def reserve(self, max_wait):
+        """
+        Takes a token and returns how long to wait before sending. Raises CircuitOpenError when
+        the circuit stays open for longer than max_wait.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.opened_until > now:
+                if self.opened_until - now > max_wait:
+                    raise CircuitOpenError()
+                circuit_wait = self.opened_until - now
+            else:
+                circuit_wait = 0.0
+                if self.opened_until:
+                    # Cooldown elapsed, let requests probe the host again
+                    self.opened_until = 0.0
+                    self.half_open = True
+
+            self.tokens = min(1.0 + self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            token_wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(circuit_wait, token_wait)
+
+    def record(self, outcome):
+        with self.lock:
+            if outcome == SUCCESS:
+                self.consecutive_failures = 0
+                self.half_open = False
+                self.cooldown = self.base_cooldown
+                self.rate = min(self.max_rate, self.rate + 0.1)
+                return
+            if outcome == FATAL:
+                return
+            if outcome == THROTTLED:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+            self.consecutive_failures += 1
+            if self.half_open or self.consecutive_failures >= self.failure_threshold:
+                if self.half_open:
+                    self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self.opened_until = time.monotonic() + self.cooldown
+                self.half_open = False
+                self.consecutive_failures = 0
+
+
+host_states = OrderedDict()
+host_states_lock = threading.Lock()
+
+
+def get_host_state(url, proxy=None):
+    """
+    Returns the shared state of a (host, proxy) pair. States are kept in LRU order and the least
+    recently used are dropped past MAX_HOST_STATES, so proxies rotated out don't pile up.
+    """
+    key = (urllib.parse.urlparse(url).netloc, proxy)
+    with host_states_lock:
+        state = host_states.get(key)
+        if state is None:
+            state = host_states[key] = HostState()
+            while len(host_states) > MAX_HOST_STATES:
+                host_states.popitem(last=False)
+        else:
+            host_states.move_to_end(key)
+        return state
+
+
+class RetryBudget:
+    """
+    Bounded number of retries shared by every request of one run.
+    """
+
+    def __init__(self, total):
+        self.lock = threading.Lock()
+        self.remaining = total
+
+    def consume(self):
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class FetchEngine:
+    """
+    Retrying fetcher for LinkedIn pages used by the scraper (async) and the job link flow (sync).
+
+    Requests go through the per-host token bucket and circuit breaker, retries use exponential
+    backoff with full jitter (honouring Retry-After) and draw from the run's RetryBudget, and
+    hopeless URLs (404/410, repeated sign-in walls) are dropped early.
+    """
+
+    def __init__(self, retry_budget=None, max_attempts=8, max_soft_failures=4, base_delay=1.0, max_delay=60.0, timeout=15):
+        self.retry_budget = retry_budget or RetryBudget(1000)
+        self.max_attempts = max_attempts
+        self.max_soft_failures = max_soft_failures
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.fatal_urls = set()
+
+    def backoff_delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, min(self.max_delay, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    def next_step(self, outcome, attempt, soft_failures):
+        """
+        Returns True when the request should be retried.
+        """
+        if outcome in (SUCCESS, FATAL):
+            return False
+        if outcome == SOFT_FAILURE and soft_failures >= self.max_soft_failures:
+            return False
+        if attempt + 1 >= self.max_attempts:
+            return False
+        return self.retry_budget.consume()
+
+    def fetch(self, url, build_headers, marker, proxy=None):
+        """
+        Blocking fetch with requests. Returns the page text or None.
+        """
+        state = get_host_state(url, proxy)
+        proxies = {"http": proxy, "https": proxy} if proxy else None
+        soft_failures = 0
+        for attempt in range(self.max_attempts):
+            try:
+                time.sleep(state.reserve(self.max_delay))
+            except CircuitOpenError:
+                return None
+            retry_after = None
+            try:
+                response = requests.get(url, headers=build_headers(), proxies=proxies, timeout=self.timeout)
+                outcome = classify_response(response.status_code, response.text, marker)
+                retry_after = response.headers.get("Retry-After")
+            except requests.RequestException:
+                outcome = RETRYABLE
+            state.record(outcome)
+            if outcome == SUCCESS:
+                return response.text
+            if outcome == FATAL:
+                self.fatal_urls.add(url)
+            soft_failures += outcome == SOFT_FAILURE
+            if not self.next_step(outcome, attempt, soft_failures):
+                return None
+            time.sleep(self.backoff_delay(attempt, retry_after))
+        return None
+
+    async def fetch_async(self, session, url, build_headers, marker, proxy=None):
+        """
+        Same as fetch, over a shared aiohttp session.
+        """
+        state = get_host_state(url, proxy)
+        soft_failures = 0
+        for attempt in range(self.max_attempts):
+            try:
+                await asyncio.sleep(state.reserve(self.max_delay))
+            except CircuitOpenError:
+                return None
+            retry_after = None
+            text = None
+            try:
+                async with session.get(url, headers=build_headers(), proxy=proxy, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                    text = await response.text()
+                    outcome = classify_response(response.status, text, marker)
+                    retry_after = response.headers.get("Retry-After")
+            except Exception:
+                outcome = RETRYABLE
+            state.record(outcome)
+            if outcome == SUCCESS:
+                return text
+            if outcome == FATAL:
+                self.fatal_urls.add(url)
+            soft_failures += outcome == SOFT_FAILURE
+            if not self.next_step(outcome, attempt, soft_failures):
+                return None
+            await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+        return None
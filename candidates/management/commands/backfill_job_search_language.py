@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from candidates.models import Job
+from candidates.utils import detect_search_language
+
+
+class Command(BaseCommand):
+    help = (
+        "Detects the language of existing jobs so their search vectors use the matching "
+        "English/French configuration. The search vector trigger re-indexes every updated row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        updated = 0
+        while True:
+            jobs = list(
+                Job.objects.filter(id__gt=last_id).order_by('id').only('id', 'description', 'search_language')[:options['batch_size']]
+            )
+            if not jobs:
+                break
+            last_id = jobs[-1].id
+
+            changed = []
+            for job in jobs:
+                language = detect_search_language(job.description)
+                if language != job.search_language:
+                    job.search_language = language
+                    changed.append(job)
+            Job.objects.bulk_update(changed, ['search_language'])
+            updated += len(changed)
+            self.stdout.write(f"Processed jobs up to id {last_id}, {updated} re-indexed")
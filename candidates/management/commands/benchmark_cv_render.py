@@ -0,0 +1,64 @@
+import time
+
+import psutil
+from django.core.management.base import BaseCommand, CommandError
+
+from candidates.models import CV
+from candidates.utils import CV_RENDER_BACKENDS
+
+
+def tree_rss(process):
+    """
+    Resident memory of a process and its children (Chrome and chromedriver for the Chrome backend).
+    """
+    total = 0
+    for member in [process] + process.children(recursive=True):
+        try:
+            total += member.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+class Command(BaseCommand):
+    help = "Benchmarks CV PDF rendering: renders/sec and resident memory per render for each backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cv-id', type=int, help='CV to render, defaults to the latest CV with data and a template.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--backends', nargs='+', default=list(CV_RENDER_BACKENDS), choices=list(CV_RENDER_BACKENDS))
+
+    def handle(self, *args, **options):
+        cvs = CV.objects.select_related('template__abstract_template').filter(
+            cv_data__isnull=False, template__isnull=False
+        )
+        cv = cvs.filter(id=options['cv_id']).first() if options['cv_id'] else cvs.order_by('-id').first()
+        if not cv:
+            raise CommandError("No CV with both data and a template to render.")
+
+        process = psutil.Process()
+        for backend in options['backends']:
+            renderer = CV_RENDER_BACKENDS[backend]
+            try:
+                # Warm-up render: launches the browser pool / loads fonts, excluded from the figures
+                renderer(cv)
+            except Exception as e:
+                self.stdout.write(f"{backend:<8} unavailable: {e}")
+                continue
+
+            baseline_rss = tree_rss(process)
+            peak_rss = baseline_rss
+            sizes = []
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                pdf_data, _ = renderer(cv)
+                sizes.append(len(pdf_data))
+                peak_rss = max(peak_rss, tree_rss(process))
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{backend:<8} {options['iterations'] / elapsed:6.2f} renders/sec  "
+                f"{elapsed / options['iterations'] * 1000:7.0f} ms/render  "
+                f"rss={baseline_rss / 2 ** 20:7.1f} MB (peak +{(peak_rss - baseline_rss) / 2 ** 20:.1f} MB)  "
+                f"pdf={sum(sizes) / len(sizes) / 1024:.0f} KB"
+            )
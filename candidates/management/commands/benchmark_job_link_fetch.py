@@ -0,0 +1,145 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import requests
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from candidates.utils import construct_job_description, hedged_fetch_description
+
+
+JOB_PAGE = (
+    b'<html><body><h2 class="top-card-layout__title">Backend Engineer</h2>'
+    b'<a class="topcard__org-name-link">PinJobs</a>'
+    b'<span class="topcard__flavor topcard__flavor--bullet">Casablanca</span>'
+    b'<div class="description__text description__text--rich">Build and run Django services.</div>'
+    b'</body></html>'
+)
+SIGN_IN_WALL = b'<html><body>Sign in to view this job</body></html>'
+
+
+def make_stub_handler(failure_rate, hang_rate, hang_seconds, median_latency):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            roll = random.random()
+            if roll < hang_rate:
+                # A dead proxy: the connection stays open until the client gives up
+                time.sleep(hang_seconds)
+                body = SIGN_IN_WALL
+            elif roll < hang_rate + failure_rate:
+                time.sleep(random.lognormvariate(0, 0.5) * median_latency)
+                body = SIGN_IN_WALL
+            else:
+                time.sleep(random.lognormvariate(0, 0.5) * median_latency)
+                body = JOB_PAGE
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return StubHandler
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the job link description fetch against a local stub server: the blocking "
+        "proxy-round strategy JobLinkCVView used before versus the async hedged fetcher."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--fanout', type=int, default=10, help='Proxied attempts per round / hedge routes.')
+        parser.add_argument('--failure-rate', type=float, default=0.3, help='Share of sign-in wall answers.')
+        parser.add_argument('--hang-rate', type=float, default=0.1, help='Share of attempts that hang.')
+        parser.add_argument('--hang-seconds', type=float, default=5.0)
+        parser.add_argument('--median-latency', type=float, default=0.4)
+        parser.add_argument('--round-sleep-scale', type=float, default=1.0,
+                            help='Scale of the 3-15 s sleep between rounds of the blocking strategy.')
+        parser.add_argument('--hedge-delay', type=float, default=0.5)
+        parser.add_argument('--deadline', type=float, default=20.0)
+
+    def handle(self, *args, **options):
+        handler = make_stub_handler(
+            options['failure_rate'], options['hang_rate'], options['hang_seconds'], options['median_latency']
+        )
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/jobs-guest/jobs/api/jobPosting/1"
+
+        try:
+            before = [self.time_call(self.blocking_fetch, url, options) for _ in range(options['iterations'])]
+            after = [self.time_call(self.hedged_fetch, url, options) for _ in range(options['iterations'])]
+        finally:
+            server.shutdown()
+
+        for label, results in (("blocking rounds (before)", before), ("async hedged (after)", after)):
+            latencies = [latency for latency, _ in results]
+            successes = sum(1 for _, ok in results if ok)
+            self.stdout.write(
+                f"{label:<26} p50={statistics.median(latencies):6.2f}s  "
+                f"p99={percentile(latencies, 99):6.2f}s  "
+                f"success={successes}/{len(results)}"
+            )
+
+    @staticmethod
+    def time_call(fetch, url, options):
+        started = time.perf_counter()
+        description = fetch(url, options)
+        return time.perf_counter() - started, bool(description)
+
+    @staticmethod
+    def blocking_fetch(url, options, max_rounds=100):
+        """
+        Mirror of the round-based fetch_job_description: one direct and fanout proxied attempts
+        per round, each with a 3 s timeout, and a 3-15 s sleep between failed rounds.
+        """
+        def attempt(route):
+            try:
+                response = requests.get(f"{url}?route={route}", timeout=3)
+                if response.status_code == 200:
+                    _, _, _, description = construct_job_description(BeautifulSoup(response.text, 'html.parser'))
+                    if "top-card-layout__title" in response.text:
+                        return description
+            except requests.RequestException:
+                pass
+            return None
+
+        for _ in range(max_rounds):
+            with ThreadPoolExecutor(max_workers=options['fanout'] + 1) as executor:
+                futures = [executor.submit(attempt, route) for route in range(options['fanout'] + 1)]
+                for future in as_completed(futures):
+                    if future.result():
+                        return future.result()
+            time.sleep(random.uniform(3, 15) * options['round_sleep_scale'])
+        return None
+
+    @staticmethod
+    def hedged_fetch(url, options):
+        async def run():
+            routes = [(f"{url}?route={route}", None) for route in range(options['fanout'] + 2)]
+            async with aiohttp.ClientSession() as session:
+                return await hedged_fetch_description(
+                    session, routes, hedge_delay=options['hedge_delay'], deadline=options['deadline']
+                )
+
+        return asyncio.run(run())
@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, OuterRef, Subquery
+
+from candidates.models import CV, Candidate, Job, JobMatch, JobSearch
+from candidates.utils import candidate_ranking_feed
+
+
+SEED_TAG = "bench-ranking"
+
+FEED_KEYS = ('feed_similarity_score', 'feed_match_score', 'feed_posted_date', 'feed_id')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the first page of the sort_by=similarity_score job feed: the per-row correlated "
+        "JobSearch subquery versus a LIMIT over the CandidateJobRanking index. --seed fills the database with synthetic jobs, "
+        "candidates and scores first (tagged so --cleanup can remove them)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Insert synthetic data before benchmarking.')
+        parser.add_argument('--cleanup', action='store_true', help='Remove the synthetic data and exit.')
+        parser.add_argument('--jobs', type=int, default=1000000)
+        parser.add_argument('--candidates', type=int, default=10000)
+        parser.add_argument('--scores-per-candidate', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--samples', type=int, default=30, help='Candidates to time each query for.')
+        parser.add_argument('--page-size', type=int, default=30)
+        parser.add_argument('--explain', action='store_true', help='Print EXPLAIN ANALYZE of both queries for one candidate.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        if options['seed']:
+            self.seed(options)
+
+        candidate_ids = list(
+            Candidate.objects.filter(first_name=SEED_TAG).values_list('id', flat=True)
+        ) or list(Candidate.objects.filter(cvs__job_searches__isnull=False).distinct().values_list('id', flat=True))
+        if not candidate_ids:
+            raise CommandError("No candidate with scored jobs, run with --seed first.")
+        candidates = Candidate.objects.filter(id__in=random.sample(candidate_ids, min(options['samples'], len(candidate_ids))))
+
+        queries = (("correlated subquery (before)", self.subquery_feed), ("ranking index (after)", self.ranking_feed))
+        if options['explain']:
+            candidate = candidates[0]
+            for label, build in queries:
+                self.stdout.write(f"--- {label}\n{build(candidate)[:options['page_size']].explain(analyze=True)}")
+
+        for label, build in queries:
+            latencies = []
+            for candidate in candidates:
+                started = time.perf_counter()
+                list(build(candidate)[:options['page_size']])
+                latencies.append((time.perf_counter() - started) * 1000)
+            latencies.sort()
+            self.stdout.write(
+                f"{label:<30} p50={statistics.median(latencies):8.1f} ms  "
+                f"p95={latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:8.1f} ms  "
+                f"samples={len(latencies)}"
+            )
+
+    @staticmethod
+    def ordering():
+        return (
+            F('similarity_score').desc(nulls_last=True),
+            F('match_score').desc(nulls_last=True),
+            F('posted_date').desc(nulls_last=True),
+        )
+
+    def subquery_feed(self, candidate):
+        """
+        The query CandidateJobsView ran before CandidateJobRanking.
+        """
+        return Job.objects.defer('embedding', 'search_vector').annotate(
+            similarity_score=Subquery(
+                JobSearch.objects.filter(cv__candidate=candidate, job_id=OuterRef('id')).values('similarity_score')[:1]
+            ),
+            match_score=Subquery(
+                JobMatch.objects.filter(candidate=candidate, job_id=OuterRef('id')).values('score')[:1]
+            )
+        ).order_by(*self.ordering())
+
+    def ranking_feed(self, candidate):
+        """
+        The ranked segment CandidateJobsView reads first, the unranked jobs only follow it.
+        """
+        ranked, _ = candidate_ranking_feed(Job.objects.all(), candidate)
+        return ranked.order_by(*[F(key).desc() for key in FEED_KEYS])
+
+    def seed(self, options):
+        batch_size = options['batch_size']
+        for start in range(0, options['jobs'], batch_size):
+            Job.objects.bulk_create([
+                Job(
+                    title=f"Job {i}", company_name=f"Company {i % 5000}", job_id=f"{SEED_TAG}-{i}",
+                    original_url=f"https://example.com/jobs/{i}",
+                    posted_date=None if i % 50 == 0 else f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                )
+                for i in range(start, min(start + batch_size, options['jobs']))
+            ])
+            self.stdout.write(f"Seeded {min(start + batch_size, options['jobs'])} jobs")
+        job_ids = list(Job.objects.filter(job_id__startswith=SEED_TAG).values_list('id', flat=True))
+
+        for start in range(0, options['candidates'], batch_size):
+            candidates = Candidate.objects.bulk_create([
+                Candidate(first_name=SEED_TAG, last_name=str(i))
+                for i in range(start, min(start + batch_size, options['candidates']))
+            ])
+            cvs = CV.objects.bulk_create([
+                CV(candidate=candidate, cv_type=CV.BASE, name=f"{SEED_TAG} base") for candidate in candidates
+            ])
+            searches, matches = [], []
+            for cv in cvs:
+                for job_id in random.sample(job_ids, min(options['scores_per_candidate'], len(job_ids))):
+                    searches.append(JobSearch(cv=cv, job_id=job_id, similarity_score=random.randint(0, 100)))
+                for job_id in random.sample(job_ids, min(options['scores_per_candidate'], len(job_ids))):
+                    matches.append(JobMatch(candidate_id=cv.candidate_id, job_id=job_id, score=random.random()))
+            # The JobSearch trigger fills CandidateJobRanking as the scores are inserted
+            JobSearch.objects.bulk_create(searches, batch_size=batch_size)
+            JobMatch.objects.bulk_create(matches, batch_size=batch_size, ignore_conflicts=True)
+            self.stdout.write(f"Seeded {start + len(candidates)} candidates")
+
+    def cleanup(self):
+        candidates = Candidate.objects.filter(first_name=SEED_TAG)
+        JobSearch.objects.filter(cv__candidate__in=candidates).delete()
+        JobMatch.objects.filter(candidate__in=candidates).delete()
+        CV.objects.filter(candidate__in=candidates).delete()
+        deleted, _ = candidates.delete()
+        self.stdout.write(f"Removed {deleted} seeded candidate rows")
+
+        while True:
+            ids = list(Job.objects.filter(job_id__startswith=SEED_TAG).values_list('id', flat=True)[:10000])
+            if not ids:
+                break
+            Job.objects.filter(id__in=ids).delete()
+            self.stdout.write(f"Removed {len(ids)} seeded jobs")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+DELETE_RANKINGS = "DELETE FROM candidates_candidatejobranking{where}"
+
+INSERT_RANKINGS = """
+INSERT INTO candidates_candidatejobranking (candidate_id, job_id, best_score, updated_at)
+SELECT cv.candidate_id, js.job_id, MAX(js.similarity_score), now()
+FROM candidates_jobsearch js
+JOIN candidates_cv cv ON cv.id = js.cv_id
+{where}
+GROUP BY cv.candidate_id, js.job_id
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds CandidateJobRanking from JobSearch. The JobSearch trigger keeps rankings current, "
+        "this repairs drift (e.g. after restoring a dump with triggers disabled)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidate-id', type=int, action='append', dest='candidate_ids',
+                            help='Only rebuild these candidates (repeatable).')
+
+    def handle(self, *args, **options):
+        candidate_ids = options['candidate_ids']
+        params = [candidate_ids] if candidate_ids else []
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(DELETE_RANKINGS.format(where=" WHERE candidate_id = ANY(%s)" if candidate_ids else ""), params)
+            deleted = cursor.rowcount
+            cursor.execute(INSERT_RANKINGS.format(where="WHERE cv.candidate_id = ANY(%s)" if candidate_ids else ""), params)
+            inserted = cursor.rowcount
+
+        self.stdout.write(f"Rebuilt job rankings: {deleted} removed, {inserted} written")
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0049_remove_answerset_group_identifier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keywordlocationcombination',
+            name='scrape_cursor',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
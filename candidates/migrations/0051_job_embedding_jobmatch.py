@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0050_keywordlocationcombination_scrape_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='JobMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_matches', to='candidates.candidate')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_matches', to='candidates.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['candidate', '-score'], name='candidates__candida_5d7fa5_idx')],
+                'unique_together': {('candidate', 'job')},
+            },
+        ),
+    ]
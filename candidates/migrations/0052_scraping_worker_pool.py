@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0051_job_embedding_jobmatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keywordlocationcombination',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapingsetting',
+            name='active_workers',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapingsetting',
+            name='jobs_reserved',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapingsetting',
+            name='run_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
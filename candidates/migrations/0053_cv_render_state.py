@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0052_scraping_worker_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='render_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('rendering', 'Rendering'), ('ready', 'Ready'), ('failed', 'Failed')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='render_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='render_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='rendered_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
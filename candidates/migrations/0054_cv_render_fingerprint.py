@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0053_cv_render_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abstracttemplate',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='render_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
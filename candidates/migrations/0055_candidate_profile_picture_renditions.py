@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0054_cv_render_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='profile_picture_renditions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
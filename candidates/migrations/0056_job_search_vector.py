@@ -0,0 +1,61 @@
+# Generated by Django 5.1.2 on 2026-10-17 13:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+# Title and company rank above the description, requirements and benefits. The row's
+# search_language picks the stemming configuration.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION candidates_job_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    config regconfig := COALESCE(NULLIF(NEW.search_language, ''), 'english')::regconfig;
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(config, COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(config, COALESCE(NEW.company_name, '')), 'A') ||
+        setweight(to_tsvector(config, COALESCE(NEW.description, '')), 'B') ||
+        setweight(to_tsvector(config, COALESCE(NEW.requirements::text, '')), 'C') ||
+        setweight(to_tsvector(config, COALESCE(NEW.benefits::text, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_job_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, company_name, description, requirements, benefits, search_language, search_vector
+ON candidates_job
+FOR EACH ROW EXECUTE PROCEDURE candidates_job_search_vector_update();
+
+UPDATE candidates_job SET search_language = search_language;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS candidates_job_search_vector_trigger ON candidates_job;
+DROP FUNCTION IF EXISTS candidates_job_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0055_candidate_profile_picture_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='search_language',
+            field=models.CharField(choices=[('english', 'English'), ('french', 'French')], default='english', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='job_search_vector_gin'),
+        ),
+    ]
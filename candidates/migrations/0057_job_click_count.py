@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0056_job_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='click_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE candidates_job
+            SET click_count = clicks.total
+            FROM (SELECT job_id, COUNT(*) AS total FROM candidates_jobclick GROUP BY job_id) AS clicks
+            WHERE candidates_job.id = clicks.job_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-17 15:00
+
+import datetime
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0057_job_click_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(
+                models.OrderBy(django.db.models.functions.comparison.Coalesce('posted_date', models.Value(datetime.date(1, 1, 1))), descending=True),
+                models.OrderBy(models.F('id'), descending=True),
+                name='job_feed_keyset_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.1.2 on 2026-10-17 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Recomputes one (candidate, job) ranking row from the candidate's JobSearch rows: the best score
+# across their CVs, or no row once no CV has scored the job.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION candidates_job_ranking_refresh(p_candidate_id bigint, p_job_id bigint) RETURNS void AS $$
+DECLARE
+    best double precision;
+BEGIN
+    SELECT MAX(js.similarity_score) INTO best
+    FROM candidates_jobsearch js
+    JOIN candidates_cv cv ON cv.id = js.cv_id
+    WHERE cv.candidate_id = p_candidate_id AND js.job_id = p_job_id;
+
+    IF best IS NULL THEN
+        DELETE FROM candidates_candidatejobranking
+        WHERE candidate_id = p_candidate_id AND job_id = p_job_id;
+    ELSE
+        INSERT INTO candidates_candidatejobranking (candidate_id, job_id, best_score, updated_at)
+        VALUES (p_candidate_id, p_job_id, best, now())
+        ON CONFLICT (candidate_id, job_id) DO UPDATE
+        SET best_score = EXCLUDED.best_score, updated_at = EXCLUDED.updated_at
+        WHERE candidates_candidatejobranking.best_score IS DISTINCT FROM EXCLUDED.best_score;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION candidates_jobsearch_ranking_update() RETURNS trigger AS $$
+DECLARE
+    old_candidate_id bigint;
+    new_candidate_id bigint;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT candidate_id INTO old_candidate_id FROM candidates_cv WHERE id = OLD.cv_id;
+        IF old_candidate_id IS NOT NULL THEN
+            PERFORM candidates_job_ranking_refresh(old_candidate_id, OLD.job_id);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT candidate_id INTO new_candidate_id FROM candidates_cv WHERE id = NEW.cv_id;
+        IF new_candidate_id IS NOT NULL AND NOT (
+            TG_OP = 'UPDATE' AND new_candidate_id = old_candidate_id AND NEW.job_id = OLD.job_id
+        ) THEN
+            PERFORM candidates_job_ranking_refresh(new_candidate_id, NEW.job_id);
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_jobsearch_ranking_trigger
+AFTER INSERT OR DELETE OR UPDATE OF cv_id, job_id, similarity_score
+ON candidates_jobsearch
+FOR EACH ROW EXECUTE PROCEDURE candidates_jobsearch_ranking_update();
+
+INSERT INTO candidates_candidatejobranking (candidate_id, job_id, best_score, updated_at)
+SELECT cv.candidate_id, js.job_id, MAX(js.similarity_score), now()
+FROM candidates_jobsearch js
+JOIN candidates_cv cv ON cv.id = js.cv_id
+GROUP BY cv.candidate_id, js.job_id;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS candidates_jobsearch_ranking_trigger ON candidates_jobsearch;
+DROP FUNCTION IF EXISTS candidates_jobsearch_ranking_update();
+DROP FUNCTION IF EXISTS candidates_job_ranking_refresh(bigint, bigint);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0058_job_feed_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateJobRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_rankings', to='candidates.candidate')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_rankings', to='candidates.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['candidate', '-best_score'], name='job_ranking_candidate_score')],
+                'unique_together': {('candidate', 'job')},
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
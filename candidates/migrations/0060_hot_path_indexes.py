@@ -0,0 +1,63 @@
+# Generated by Django 5.1.2 on 2026-10-17 16:30
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+# Keeps one JobSearch per (cv, job) before the unique constraint: the most recently scored row,
+# marked applied if any of its duplicates was.
+DEDUPLICATE_JOB_SEARCHES = """
+UPDATE candidates_jobsearch keeper
+SET is_applied = TRUE
+WHERE NOT keeper.is_applied AND EXISTS (
+    SELECT 1 FROM candidates_jobsearch duplicate
+    WHERE duplicate.cv_id = keeper.cv_id AND duplicate.job_id = keeper.job_id AND duplicate.is_applied
+);
+
+DELETE FROM candidates_jobsearch
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY cv_id, job_id
+            ORDER BY last_scored_at DESC NULLS LAST, updated_at DESC, id DESC
+        ) AS position
+        FROM candidates_jobsearch
+    ) ranked
+    WHERE ranked.position > 1
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0059_candidatejobranking'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUPLICATE_JOB_SEARCHES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='jobsearch',
+            constraint=models.UniqueConstraint(fields=('cv', 'job'), name='jobsearch_unique_cv_job'),
+        ),
+        migrations.AddIndex(
+            model_name='jobsearch',
+            index=models.Index(fields=['job', 'cv'], name='jobsearch_job_cv'),
+        ),
+        migrations.AddIndex(
+            model_name='jobsearch',
+            index=models.Index(fields=['cv', 'last_scored_at'], name='jobsearch_cv_last_scored'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(models.F('candidate'), django.db.models.functions.text.Lower('term'), name='searchterm_candidate_term'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['candidate', '-last_searched_at'], name='searchterm_active_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['candidate', 'cv_type'], name='cv_candidate_type'),
+        ),
+    ]
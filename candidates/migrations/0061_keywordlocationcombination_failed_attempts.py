@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0060_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keywordlocationcombination',
+            name='failed_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
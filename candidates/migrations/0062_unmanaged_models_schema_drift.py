@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# CV and GeneralSetting are managed=False and these columns were added to the live tables by hand,
+# so a fresh database (e.g. the test database) lacked them. IF NOT EXISTS keeps existing databases
+# untouched.
+ADD_COLUMNS = """
+ALTER TABLE candidates_cv ADD COLUMN IF NOT EXISTS career_id bigint NULL
+    REFERENCES candidates_career (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX IF NOT EXISTS candidates_cv_career_id_idx ON candidates_cv (career_id);
+ALTER TABLE candidates_generalsetting ADD COLUMN IF NOT EXISTS credits_to_start_with integer NOT NULL DEFAULT 10
+    CHECK (credits_to_start_with >= 0);
+ALTER TABLE candidates_generalsetting ADD COLUMN IF NOT EXISTS num_of_careers_to_generate integer NOT NULL DEFAULT 5
+    CHECK (num_of_careers_to_generate >= 0);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0061_keywordlocationcombination_failed_attempts'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_COLUMNS, migrations.RunSQL.noop),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='cv',
+                    name='career',
+                    field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tailored_cvs', to='candidates.career'),
+                ),
+                migrations.AddField(
+                    model_name='generalsetting',
+                    name='credits_to_start_with',
+                    field=models.PositiveIntegerField(default=10, help_text='Number of credits to start with'),
+                ),
+                migrations.AddField(
+                    model_name='generalsetting',
+                    name='num_of_careers_to_generate',
+                    field=models.PositiveIntegerField(default=5, help_text='Number of careers to generate'),
+                ),
+            ],
+        ),
+    ]
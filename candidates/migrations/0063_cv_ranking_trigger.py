@@ -0,0 +1,47 @@
+# Generated by Django 5.1.2 on 2026-10-17 18:00
+
+from django.db import migrations
+
+
+# Moving a CV to another candidate moves its scores with it: every job the CV scored is
+# recomputed for both the previous and the new owner.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION candidates_cv_ranking_update() RETURNS trigger AS $$
+DECLARE
+    scored_job_id bigint;
+BEGIN
+    FOR scored_job_id IN SELECT DISTINCT job_id FROM candidates_jobsearch WHERE cv_id = NEW.id LOOP
+        IF OLD.candidate_id IS NOT NULL THEN
+            PERFORM candidates_job_ranking_refresh(OLD.candidate_id, scored_job_id);
+        END IF;
+        IF NEW.candidate_id IS NOT NULL THEN
+            PERFORM candidates_job_ranking_refresh(NEW.candidate_id, scored_job_id);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_cv_ranking_trigger
+AFTER UPDATE OF candidate_id
+ON candidates_cv
+FOR EACH ROW
+WHEN (OLD.candidate_id IS DISTINCT FROM NEW.candidate_id)
+EXECUTE PROCEDURE candidates_cv_ranking_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS candidates_cv_ranking_trigger ON candidates_cv;
+DROP FUNCTION IF EXISTS candidates_cv_ranking_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0062_unmanaged_models_schema_drift'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Coalesce, Lower
+from datetime import date
 from uuid import uuid4
 
 
@@ -19,6 +23,7 @@ class Candidate(models.Model):
     country = models.CharField(max_length=100, blank=True, null=True)
     credits = models.FloatField(default=0)
     profile_picture = models.ImageField(upload_to="profile_pictures/", blank=True, null=True)
+    profile_picture_renditions = models.JSONField(blank=True, null=True)  # {size: storage name} of resized avatars
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,6 +57,7 @@ class AbstractTemplate(models.Model):
     name = models.CharField(max_length=255)
     reference = models.CharField(max_length=255, blank=True, null=True)
     image = models.ImageField(upload_to='template_images/', blank=True, null=True)
+    version = models.PositiveIntegerField(default=1)  # Bump when the frontend design changes to re-render CVs
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -111,6 +117,18 @@ class CV(models.Model):
         (BASE, 'Base CV'),
         (TAILORED, 'Tailored CV'),
     ]
+
+    RENDER_PENDING = 'pending'
+    RENDER_RENDERING = 'rendering'
+    RENDER_READY = 'ready'
+    RENDER_FAILED = 'failed'
+
+    RENDER_STATUS_CHOICES = [
+        (RENDER_PENDING, 'Pending'),
+        (RENDER_RENDERING, 'Rendering'),
+        (RENDER_READY, 'Ready'),
+        (RENDER_FAILED, 'Failed'),
+    ]
     uid = models.UUIDField(default=uuid4, unique=True, editable=False, max_length=32)
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='cvs')
     original_file = models.FileField(upload_to='Cvs/original/', blank=True, null=True)
@@ -121,12 +139,20 @@ class CV(models.Model):
     job = models.ForeignKey('Job', on_delete=models.CASCADE, null=True, blank=True, related_name='tailored_cvs')
     career = models.ForeignKey('Career', on_delete=models.CASCADE, null=True, blank=True, related_name='tailored_cvs')
     thumbnail = models.ImageField(upload_to='Cvs/thumbnails/', blank=True, null=True)
+    render_version = models.PositiveIntegerField(default=0)  # Bumped on every render request
+    rendered_version = models.PositiveIntegerField(default=0)  # Version the stored PDF reflects
+    render_status = models.CharField(max_length=10, choices=RENDER_STATUS_CHOICES, blank=True, null=True)
+    render_updated_at = models.DateTimeField(blank=True, null=True)
+    render_fingerprint = models.CharField(max_length=64, blank=True, null=True)  # Content hash of the stored PDF
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         managed = False
         db_table = "candidates_cv"
+        indexes = [
+            models.Index(fields=['candidate', 'cv_type'], name='cv_candidate_type'),
+        ]
 
     def __str__(self):
         return f"{self.get_cv_type_display()} for {self.candidate.first_name} {self.candidate.last_name}"
@@ -204,6 +230,7 @@ class Job(models.Model):
     benefits = models.JSONField(blank=True, null=True)
     skills_required = models.JSONField(blank=True, null=True)
     posted_date = models.DateField(blank=True, null=True)
+    FEED_NULL_DATE = date.min  # Sorts jobs without a posted_date last in the keyset-paginated feed
     expiration_date = models.DateField(blank=True, null=True)
     industry = models.CharField(max_length=500, blank=True, null=True)
 
@@ -227,9 +254,27 @@ class Job(models.Model):
         related_name='clicked_jobs'
     )
     job_id = models.CharField(max_length=50, unique=True, blank=True, null=True)
+    click_count = models.PositiveIntegerField(default=0)  # Denormalized count of JobClick rows
+    embedding = models.BinaryField(blank=True, null=True)  # Hashed term-frequency vector used for local pre-ranking
+    SEARCH_LANGUAGE_CHOICES = [
+        ('english', 'English'),
+        ('french', 'French'),
+    ]
+    search_language = models.CharField(max_length=10, choices=SEARCH_LANGUAGE_CHOICES, default='english')
+    # Maintained by a database trigger from title, company, description, requirements and benefits
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='job_search_vector_gin'),
+            models.Index(
+                Coalesce('posted_date', models.Value(date.min)).desc(), models.F('id').desc(),
+                name='job_feed_keyset_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} at {self.company_name}"
 
@@ -282,10 +327,56 @@ class JobSearch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cv', 'job'], name='jobsearch_unique_cv_job'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'cv'], name='jobsearch_job_cv'),
+            models.Index(fields=['cv', 'last_scored_at'], name='jobsearch_cv_last_scored'),
+        ]
+
     def __str__(self):
         return f"Job search for {self.cv} - {self.job.title}"
 
 
+class CandidateJobRanking(models.Model):
+    """
+    Best JobSearch score per job across a candidate's CVs, the sort key of the similarity feed.
+    Rows are maintained by database triggers on candidates_jobsearch (migration 0059) and on
+    candidates_cv ownership changes (migration 0063).
+    """
+    candidate = models.ForeignKey('Candidate', on_delete=models.CASCADE, related_name='job_rankings')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='candidate_rankings')
+    best_score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('candidate', 'job')
+        indexes = [
+            models.Index(fields=['candidate', '-best_score'], name='job_ranking_candidate_score'),
+        ]
+
+    def __str__(self):
+        return f"Ranking for {self.candidate} - {self.job.title}"
+
+
+class JobMatch(models.Model):
+    candidate = models.ForeignKey('Candidate', on_delete=models.CASCADE, related_name='job_matches')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='job_matches')
+    score = models.FloatField()  # Cosine similarity between the base CV and the job embeddings
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('candidate', 'job')
+        indexes = [
+            models.Index(fields=['candidate', '-score']),
+        ]
+
+    def __str__(self):
+        return f"Match for {self.candidate} - {self.job.title}"
+
+
 class JobClick(models.Model):
     job = models.ForeignKey(Job, on_delete=models.CASCADE)
     candidate = models.ForeignKey('Candidate', on_delete=models.CASCADE)
@@ -354,6 +445,9 @@ class KeywordLocationCombination(models.Model):
     keyword = models.ForeignKey(Keyword, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     is_scraped = models.BooleanField(default=False)
+    scrape_cursor = models.PositiveIntegerField(default=0)  # Next search results offset to resume pagination from
+    claimed_at = models.DateTimeField(blank=True, null=True)  # Set while a scraping worker owns the combination
+    failed_attempts = models.PositiveIntegerField(default=0)  # Consecutive failed scrapes, skipped once it reaches the limit
 
     class Meta:
         unique_together = ('keyword', 'location')
@@ -388,6 +482,9 @@ class GeneralSetting(models.Model):
 class ScrapingSetting(models.Model):
     num_jobs_to_scrape = models.IntegerField(default=100)
     is_scraping = models.BooleanField(default=False)
+    run_started_at = models.DateTimeField(blank=True, null=True)
+    jobs_reserved = models.IntegerField(default=0)  # Share of num_jobs_to_scrape handed out to workers in this run
+    active_workers = models.IntegerField(default=0)
 
     def __str__(self):
         return f"Scraping Settings: {self.num_jobs_to_scrape} jobs"
@@ -449,6 +546,15 @@ class SearchTerm(models.Model):
     is_active = models.BooleanField(default=True)
     last_searched_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(models.F('candidate'), Lower('term'), name='searchterm_candidate_term'),
+            models.Index(
+                fields=['candidate', '-last_searched_at'], condition=models.Q(is_active=True),
+                name='searchterm_active_recent',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.term} (Active: {self.is_active})"
 
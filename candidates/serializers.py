@@ -9,6 +9,7 @@ import base64
 from django.core.files.storage import default_storage
 from mimetypes import guess_type
 from django.core.cache import cache
+from .constants import PROFILE_PICTURE_DEFAULT_SIZE
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -17,20 +18,25 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email']
 
 
+class ProfilePictureField(serializers.ImageField):
+    """
+    Accepts an uploaded profile picture and represents it the way CandidateSerializer serves it.
+    """
+
+    def to_representation(self, value):
+        return self.parent.get_profile_picture(value.instance)
+
+
 class CandidateSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
-    # profile_picture = serializers.ImageField(
-    #     required=False,
-    #     allow_null=True,
-    #     use_url=True
-    # )
-    profile_picture = serializers.SerializerMethodField(read_only=True)
+    profile_picture = ProfilePictureField(required=False, allow_null=True)
+    profile_picture_renditions = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Candidate
         fields = [
             'id', 'first_name', 'last_name', 'phone', 'age', 'city',
-            'country', 'credits', 'profile_picture', 'user'
+            'country', 'credits', 'profile_picture', 'profile_picture_renditions', 'user'
         ]
 
     def validate_profile_picture(self, value):
@@ -43,20 +49,37 @@ class CandidateSerializer(serializers.ModelSerializer):
         return value
 
     def get_profile_picture(self, obj):
-        """Returns the image as a base64 string with the proper data URI prefix, cached."""
-        # 1. If candidate has no profile picture, just return None
+        """
+        Returns the URL of the default avatar rendition, or the base64 data URI of the original
+        when the request opts in with ?picture_format=base64.
+        """
         if not obj.profile_picture or not obj.profile_picture.name:
             return None
 
-        # 2. Generate a unique cache key for this candidate’s base64 image
+        request = self.context.get("request")
+        if request and request.query_params.get("picture_format") == "base64":
+            return self.get_profile_picture_base64(obj)
+
+        renditions = obj.profile_picture_renditions or {}
+        name = renditions.get(str(PROFILE_PICTURE_DEFAULT_SIZE))
+        # Pictures uploaded before renditions existed are served as is
+        return default_storage.url(name) if name else obj.profile_picture.url
+
+    def get_profile_picture_renditions(self, obj):
+        renditions = obj.profile_picture_renditions or {}
+        return {size: default_storage.url(name) for size, name in renditions.items()} or None
+
+    def get_profile_picture_base64(self, obj):
+        """Returns the image as a base64 string with the proper data URI prefix, cached."""
+        # 1. Generate a unique cache key for this candidate’s base64 image
         cache_key = f"candidate_profile_base64_{obj.id}"
 
-        # 3. Try retrieving from cache
+        # 2. Try retrieving from cache
         cached_data_uri = cache.get(cache_key)
         if cached_data_uri:
             return cached_data_uri  # Found in cache, return immediately
 
-        # 4. Not in cache – read from S3, encode, then cache
+        # 3. Not in cache – read from S3, encode, then cache
         try:
             with default_storage.open(obj.profile_picture.name, "rb") as f:
                 file_data = f.read()
@@ -70,7 +93,7 @@ class CandidateSerializer(serializers.ModelSerializer):
             # Full data URI
             data_uri = f"data:{mime_type};base64,{encoded_image}"
 
-            # 5. Store in cache for future calls
+            # 4. Store in cache for future calls
             # Adjust the timeout (in seconds) as needed. Or remove it for "indefinite".
             cache.set(cache_key, data_uri, timeout=60 * 60)  # 1 hour
 
@@ -171,7 +194,7 @@ class JobSerializer(serializers.ModelSerializer):
     similarity_scores = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
     is_applied = serializers.SerializerMethodField()
-    click_count = serializers.SerializerMethodField()
+    click_count = serializers.IntegerField(read_only=True)
     is_ad = serializers.SerializerMethodField()
 
     class Meta:
@@ -190,9 +213,6 @@ class JobSerializer(serializers.ModelSerializer):
         applies_map = self.context.get('applies_map', {})
         return applies_map.get(obj.id, False)
 
-    def get_click_count(self, obj):
-        return obj.clicked_by.count()
-
     def get_is_ad(self, obj):
         return False
 
@@ -233,7 +253,9 @@ class CVSerializer(serializers.ModelSerializer):
     class Meta:
         model = CV
         fields = ['id', 'uid', 'name', 'original_file', 'cv_type', 'generated_pdf',
-                  'thumbnail', 'cv_data', 'job', 'career', 'template', 'lang', 'created_at', 'updated_at']
+                  'thumbnail', 'cv_data', 'job', 'career', 'template', 'lang', 'render_status', 'render_version',
+                  'created_at', 'updated_at']
+        read_only_fields = ['render_status', 'render_version']
 
     def get_template(self, obj):
         # Serialize the associated template, if it exists
@@ -1,12 +1,12 @@
 from django.db.models.signals import post_save, pre_save, pre_delete
 from django.dispatch import receiver
 from .models import (Keyword, Location, KeywordLocationCombination, CV, Template, AbstractTemplate, CVData, UserProfile,
-                     Candidate, JobSearch)
+                     Candidate, JobSearch, Job)
 from django.contrib.auth.models import User
 from .constants import DEFAULT_TEMPLATE_DATA
-from .utils import (generate_cv_pdf, construct_only_score_job_prompt, construct_candidate_profile,
-                    get_gemini_response, construct_similarity_prompt, detect_cv_language)
-import json
+from .utils import (construct_only_score_job_prompt, construct_candidate_profile, get_similarity_scores,
+                    detect_cv_language, detect_search_language)
+from .tasks import enqueue_cv_render
 from datetime import datetime
 
 
@@ -138,8 +138,8 @@ def handle_cv_update(sender, instance, **kwargs):
         template_lang = cv_lang if cv_lang in language_values else None
         Template.objects.filter(id=cv.template.id).update(language=template_lang)
 
-        # Generate PDF if both cv_data and template exist
-        generate_cv_pdf(cv)
+        # Queue a PDF render if both cv_data and template exist
+        enqueue_cv_render(cv.id)
 
 
 @receiver(post_save, sender=User)
@@ -212,13 +212,8 @@ def generate_score_for_tailored_cv(sender, instance, created, **kwargs):
             }
             candidate_profile = construct_candidate_profile(tailored_cv_data)
 
-            prompt = construct_similarity_prompt(candidate_profile, [job_data])
-
-            # Fetch the similarity score from Gemini
-            gemini_response = get_gemini_response(prompt)
-            gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-
-            score_data = json.loads(gemini_response)[0]
+            # Fetch the similarity score from the LLM cache or Gemini
+            score_data = get_similarity_scores(candidate_profile, [job_data])[0]
             score = score_data.get("score", 0)
 
             job_search = JobSearch.objects.filter(cv=base_cv, job=job).first()
@@ -237,6 +232,15 @@ def generate_score_for_tailored_cv(sender, instance, created, **kwargs):
             print(f"Failed to generate similarity score for tailored CV: {e}")
 
 
+@receiver(pre_save, sender=Job)
+def set_job_search_language(sender, instance, update_fields=None, **kwargs):
+    """
+    Picks the full-text search configuration of jobs saved one by one (bulk inserts set it themselves).
+    """
+    if update_fields is None:
+        instance.search_language = detect_search_language(instance.description)
+
+
 @receiver(pre_save, sender=JobSearch)
 def prevent_small_similarity_score_changes(sender, instance, **kwargs):
     """
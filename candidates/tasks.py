@@ -1,11 +1,31 @@
 from celery import shared_task
+from celery.signals import worker_process_init
 from django.utils import timezone
-from .models import Candidate, CV, CVData, ScrapingSetting, KeywordLocationCombination
-from .utils import scrape_jobs
-from datetime import timedelta
+from .models import Candidate, CV, CVData, ScrapingSetting, KeywordLocationCombination, Job, JobSearch, JobMatch
+from .utils import (scrape_jobs, construct_candidate_profile, get_similarity_scores, construct_job_scoring_data,
+                    pack_jobs_for_scoring, chrome_pool, generate_cv_pdf, send_user_notification,
+                    ScrapedJobIndex)
+from .constants import (JOB_MATCH_TOP_K, JOB_MATCH_LLM_RESCORE_TOP_K, JOB_MATCH_CHUNK_SIZE,
+                        SCORING_ACTIVE_CANDIDATE_DAYS, SCRAPING_CLAIM_TIMEOUT_MINUTES, SCRAPING_RUN_TIMEOUT_HOURS,
+                        SCRAPING_MAX_FAILED_ATTEMPTS,
+                        CV_RENDER_DEBOUNCE_SECONDS, CV_RENDER_STALE_MINUTES)
+from .embeddings import (EMBEDDING_DIM, embed_job, embed_candidate_profile, vector_from_bytes, normalize_rows,
+                         compute_idf, merge_top_k)
+from django.db import transaction
+from django.db.models import F, Q
+from django.conf import settings as django_settings
+import numpy as np
+from datetime import datetime, timedelta
 from django.forms.models import model_to_dict
 
 
+@worker_process_init.connect
+def warm_chrome_pool(**kwargs):
+    # Each forked worker launches its own browsers, ready before the first render arrives
+    if django_settings.CHROME_POOL_WARM_ON_BOOT:
+        chrome_pool.warm()
+
+
 @shared_task
 def scheduled_job_scraping():
     candidates = Candidate.objects.filter(is_scraping=False)
@@ -60,41 +80,373 @@ def get_cv_data(candidate):
 
 @shared_task
 def run_scraping_task():
+    """
+    Starts a scraping run: resets the run budget and fans out SCRAPING_CONCURRENCY workers that
+    claim unscraped combinations one at a time.
+    """
+    with transaction.atomic():
+        settings = ScrapingSetting.objects.select_for_update().first()
+        run_timeout = timedelta(hours=SCRAPING_RUN_TIMEOUT_HOURS)
+        if settings.is_scraping and settings.run_started_at and timezone.now() - settings.run_started_at < run_timeout:
+            print("Scraping task already running. Exiting.")
+            return
 
-    settings = ScrapingSetting.objects.first()
-    if settings.is_scraping:
-        print("Scraping task already running. Exiting.")
-        return
+        settings.is_scraping = True
+        settings.run_started_at = timezone.now()
+        settings.jobs_reserved = 0
+        settings.active_workers = django_settings.SCRAPING_CONCURRENCY
+        settings.save()
+        run_started_at = settings.run_started_at.isoformat()
 
-    settings.is_scraping = True
-    settings.save()
+    for _ in range(django_settings.SCRAPING_CONCURRENCY):
+        scrape_combinations_worker.delay(run_started_at)
 
-    try:
-        num_jobs_to_scrape = settings.num_jobs_to_scrape
-        total_jobs_scraped = 0
 
-        # Fetch unscripted combinations
-        combinations = KeywordLocationCombination.objects.filter(is_scraped=False)
+def reserve_scraping_budget():
+    """
+    Atomically takes a share of the run's num_jobs_to_scrape, returns 0 once it is spent.
+    """
+    with transaction.atomic():
+        settings = ScrapingSetting.objects.select_for_update().first()
+        remaining = settings.num_jobs_to_scrape - settings.jobs_reserved
+        share = -(-settings.num_jobs_to_scrape // max(1, django_settings.SCRAPING_CONCURRENCY))
+        budget = max(0, min(remaining, share))
+        if budget:
+            settings.jobs_reserved = F('jobs_reserved') + budget
+            settings.save(update_fields=['jobs_reserved'])
+        return budget
+
+
+def release_scraping_budget(unused):
+    if unused > 0:
+        ScrapingSetting.objects.update(jobs_reserved=F('jobs_reserved') - unused)
+
 
-        for combination in combinations:
+def claim_next_combination():
+    """
+    Claims an unscraped combination no other worker holds. Claims left by a dead worker, or kept
+    by a failed scrape as a back-off, expire after SCRAPING_CLAIM_TIMEOUT_MINUTES and resume from
+    the persisted cursor. Combinations that failed SCRAPING_MAX_FAILED_ATTEMPTS times are skipped.
+    """
+    stale_before = timezone.now() - timedelta(minutes=SCRAPING_CLAIM_TIMEOUT_MINUTES)
+    with transaction.atomic():
+        combination = KeywordLocationCombination.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale_before),
+            is_scraped=False,
+            failed_attempts__lt=SCRAPING_MAX_FAILED_ATTEMPTS
+        ).select_related('keyword', 'location').order_by('id').first()
+        if combination:
+            combination.claimed_at = timezone.now()
+            combination.save(update_fields=['claimed_at'])
+        return combination
 
-            keyword = combination.keyword.keyword
-            location = combination.location.location
 
-            jobs_collected = scrape_jobs(keyword, location, num_jobs_to_scrape - total_jobs_scraped)
-            total_jobs_scraped += len(jobs_collected)
+def finish_scraping_worker(run_started_at):
+    """
+    Marks one worker of the run started at run_started_at as done; the last one closes the run
+    and queues the scoring tasks. Workers of a stale run that was restarted are ignored.
+    """
+    with transaction.atomic():
+        settings = ScrapingSetting.objects.select_for_update().first()
+        if settings.run_started_at is None or settings.run_started_at.isoformat() != run_started_at:
+            print(f"Ignoring worker of the stale scraping run started at {run_started_at}")
+            return
+        settings.active_workers = max(0, settings.active_workers - 1)
+        last_worker = settings.active_workers == 0
+        if last_worker:
+            settings.is_scraping = False
+        settings.save(update_fields=['active_workers', 'is_scraping'])
+        run_started_at = settings.run_started_at
 
-            # Mark the combination as scraped if all jobs fetched
-            if not jobs_collected or len(jobs_collected) < num_jobs_to_scrape:
-                combination.is_scraped = True
-                combination.save()
+    if last_worker and run_started_at:
+        rank_jobs_for_candidates.delay()
+        score_new_jobs.delay(run_started_at.isoformat())
 
-            if total_jobs_scraped >= num_jobs_to_scrape:
+
+@shared_task
+def scrape_combinations_worker(run_started_at):
+    # Built from the Job table on the first claim and kept current by scrape_jobs across combinations
+    scraped_job_index = None
+    try:
+        while True:
+            budget = reserve_scraping_budget()
+            if not budget:
                 break
+            combination = claim_next_combination()
+            if not combination:
+                release_scraping_budget(budget)
+                break
+
+            # Filled by scrape_jobs as it goes, so a failed scrape still accounts for the jobs it kept
+            jobs_collected = []
+            try:
+                keyword = combination.keyword.keyword
+                location = combination.location.location
+                if scraped_job_index is None:
+                    scraped_job_index = ScrapedJobIndex.load()
+                _, exhausted = scrape_jobs(
+                    keyword, location, budget, combination=combination, collected=jobs_collected,
+                    scraped_job_index=scraped_job_index
+                )
 
+                # Only retire the combination once its whole search was processed, otherwise the
+                # next claim resumes from the persisted cursor
+                if exhausted:
+                    combination.is_scraped = True
+                combination.failed_attempts = 0
+                # A run that made no progress keeps its claim as a back-off, like a failed one
+                if exhausted or jobs_collected:
+                    combination.claimed_at = None
+            except Exception as e:
+                # Keep the claim so it expires as a back-off instead of being reclaimed right away
+                combination.failed_attempts += 1
+                print(f"Error scraping combination {combination} "
+                      f"(attempt {combination.failed_attempts}/{SCRAPING_MAX_FAILED_ATTEMPTS}): {e}")
+            finally:
+                combination.save(update_fields=['is_scraped', 'claimed_at', 'failed_attempts'])
+                release_scraping_budget(budget - len(jobs_collected))
     except Exception as e:
         print(f"Error during scraping task: {e}")
     finally:
-        # Ensure the is_scraping flag is reset
-        settings.is_scraping = False
-        settings.save()
\ No newline at end of file
+        finish_scraping_worker(run_started_at)
+
+
+def backfill_job_embeddings():
+    jobs_to_update = []
+    for job in Job.objects.filter(embedding__isnull=True).only(
+            'id', 'title', 'description', 'requirements', 'skills_required').iterator(chunk_size=JOB_MATCH_CHUNK_SIZE):
+        job.embedding = embed_job(job)
+        jobs_to_update.append(job)
+        if len(jobs_to_update) >= JOB_MATCH_CHUNK_SIZE:
+            Job.objects.bulk_update(jobs_to_update, ['embedding'])
+            jobs_to_update = []
+    if jobs_to_update:
+        Job.objects.bulk_update(jobs_to_update, ['embedding'])
+
+
+def iter_job_embedding_chunks():
+    ids, vectors = [], []
+    for job_id, embedding in Job.objects.values_list('id', 'embedding').iterator(chunk_size=JOB_MATCH_CHUNK_SIZE):
+        ids.append(job_id)
+        vectors.append(vector_from_bytes(embedding))
+        if len(ids) >= JOB_MATCH_CHUNK_SIZE:
+            yield np.array(ids, dtype=np.int64), np.vstack(vectors)
+            ids, vectors = [], []
+    if ids:
+        yield np.array(ids, dtype=np.int64), np.vstack(vectors)
+
+
+@shared_task
+def rank_jobs_for_candidates():
+    """
+    Pre-ranks every job for every candidate with a base CV using local embeddings, stores the
+    top JOB_MATCH_TOP_K as JobMatch rows and asks Gemini to score only the best few of them.
+    """
+    backfill_job_embeddings()
+
+    base_cvs = [cv for cv in CV.objects.filter(cv_type=CV.BASE).select_related('cv_data') if hasattr(cv, 'cv_data')]
+    if not base_cvs:
+        return
+
+    candidate_profiles = [construct_candidate_profile(cv.cv_data) for cv in base_cvs]
+    candidate_matrix = np.vstack([embed_candidate_profile(profile) for profile in candidate_profiles])
+
+    # First pass: document frequencies for IDF weighting
+    document_frequencies = np.zeros(EMBEDDING_DIM, dtype=np.float64)
+    total_documents = 0
+    for _, vectors in iter_job_embedding_chunks():
+        document_frequencies += (vectors > 0).sum(axis=0)
+        total_documents += len(vectors)
+    if not total_documents:
+        return
+    idf = compute_idf(document_frequencies, total_documents)
+    candidate_matrix = normalize_rows(candidate_matrix * idf)
+
+    # Second pass: cosine similarity of every job against every candidate, one chunk at a time
+    best_scores = np.empty((len(base_cvs), 0), dtype=np.float32)
+    best_ids = np.empty((len(base_cvs), 0), dtype=np.int64)
+    for ids, vectors in iter_job_embedding_chunks():
+        chunk_scores = candidate_matrix @ normalize_rows(vectors * idf).T
+        best_scores, best_ids = merge_top_k(best_scores, best_ids, chunk_scores, ids, JOB_MATCH_TOP_K)
+
+    candidate_ids = [cv.candidate_id for cv in base_cvs]
+    matches = []
+    for row, candidate_id in enumerate(candidate_ids):
+        for score, job_id in zip(best_scores[row], best_ids[row]):
+            matches.append(JobMatch(candidate_id=candidate_id, job_id=int(job_id), score=float(score)))
+
+    with transaction.atomic():
+        JobMatch.objects.filter(candidate_id__in=candidate_ids).delete()
+        JobMatch.objects.bulk_create(matches, batch_size=JOB_MATCH_CHUNK_SIZE)
+
+    # Only the best pre-ranked jobs that were never scored go to Gemini
+    for row, cv in enumerate(base_cvs):
+        ranked_ids = [int(job_id) for job_id in best_ids[row][np.argsort(-best_scores[row])]]
+        scored_ids = set(JobSearch.objects.filter(cv=cv, job_id__in=ranked_ids).values_list('job_id', flat=True))
+        top_ids = [job_id for job_id in ranked_ids if job_id not in scored_ids][:JOB_MATCH_LLM_RESCORE_TOP_K]
+        if not top_ids:
+            continue
+
+        jobs_data = [construct_job_scoring_data(job) for job in Job.objects.filter(id__in=top_ids)]
+        try:
+            scores = get_similarity_scores(candidate_profiles[row], jobs_data)
+        except Exception as e:
+            print(f"Error scoring pre-ranked jobs for CV {cv.id}: {e}")
+            continue
+
+        valid_ids = set(top_ids)
+        upsert_job_searches([
+            JobSearch(cv=cv, job_id=int(score_data['id']), similarity_score=score_data['score'],
+                      last_scored_at=timezone.now())
+            for score_data in scores if int(score_data['id']) in valid_ids
+        ])
+
+
+def upsert_job_searches(job_searches):
+    """
+    Inserts new scores, overwriting the score of (cv, job) pairs another task wrote in the
+    meantime: rank_jobs_for_candidates and score_new_jobs run together after a scraping run.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement, keep the last score per pair
+    unique_searches = {(job_search.cv_id, job_search.job_id): job_search for job_search in job_searches}
+    JobSearch.objects.bulk_create(
+        list(unique_searches.values()),
+        update_conflicts=True,
+        unique_fields=['cv', 'job'],
+        update_fields=['similarity_score', 'last_scored_at']
+    )
+
+
+@shared_task
+def score_new_jobs(since):
+    """
+    Scores the jobs created since the given ISO timestamp against the base CV of every active
+    candidate, packing as many jobs per Gemini prompt as the token budget allows.
+    """
+    new_jobs = list(Job.objects.filter(created_at__gte=datetime.fromisoformat(since)))
+    if not new_jobs:
+        return
+    new_job_ids = [job.id for job in new_jobs]
+    jobs_data = [construct_job_scoring_data(job) for job in new_jobs]
+
+    active_since = timezone.now() - timedelta(days=SCORING_ACTIVE_CANDIDATE_DAYS)
+    base_cvs = CV.objects.filter(
+        cv_type=CV.BASE,
+        candidate__user__is_active=True
+    ).filter(
+        Q(candidate__user__last_login__gte=active_since) |
+        Q(candidate__search_terms__last_searched_at__gte=active_since)
+    ).select_related('cv_data').distinct()
+
+    for cv in base_cvs:
+        if not hasattr(cv, 'cv_data'):
+            continue
+
+        existing_searches = {js.job_id: js for js in JobSearch.objects.filter(cv=cv, job_id__in=new_job_ids)}
+        jobs_to_score = [
+            job_data for job_data in jobs_data
+            if job_data["id"] not in existing_searches
+            or not existing_searches[job_data["id"]].last_scored_at
+            or existing_searches[job_data["id"]].last_scored_at < cv.cv_data.updated_at
+        ]
+        if not jobs_to_score:
+            continue
+
+        candidate_profile = construct_candidate_profile(cv.cv_data)
+        valid_ids = {job_data["id"] for job_data in jobs_to_score}
+        searches_to_create = []
+        searches_to_update = []
+        for jobs_pack in pack_jobs_for_scoring(candidate_profile, jobs_to_score):
+            try:
+                scores = get_similarity_scores(candidate_profile, jobs_pack, rate_limited=True)
+            except Exception as e:
+                print(f"Error scoring new jobs for CV {cv.id}: {e}")
+                continue
+
+            scored_at = timezone.now()
+            for score_data in scores:
+                try:
+                    job_id = int(score_data["id"])
+                    score = float(score_data["score"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if job_id not in valid_ids:
+                    continue
+                job_search = existing_searches.get(job_id)
+                if job_search:
+                    job_search.similarity_score = score
+                    job_search.last_scored_at = scored_at
+                    searches_to_update.append(job_search)
+                else:
+                    searches_to_create.append(
+                        JobSearch(cv=cv, job_id=job_id, similarity_score=score, last_scored_at=scored_at)
+                    )
+
+        upsert_job_searches(searches_to_create)
+        JobSearch.objects.bulk_update(searches_to_update, ['similarity_score', 'last_scored_at'])
+
+
+def enqueue_cv_render(cv_id):
+    """
+    Requests a PDF and thumbnail render of a CV without blocking the caller. While a render is
+    queued or running, further requests only bump render_version: the task in flight sees the
+    newer version when it finishes and renders once more, so N rapid edits cost at most two
+    renders.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        state = CV.objects.select_for_update().filter(id=cv_id).values('render_status', 'render_updated_at').first()
+        if state is None:
+            return
+        in_flight = (
+            state['render_status'] in (CV.RENDER_PENDING, CV.RENDER_RENDERING)
+            and state['render_updated_at']
+            and state['render_updated_at'] > now - timedelta(minutes=CV_RENDER_STALE_MINUTES)
+        )
+        updates = {'render_version': F('render_version') + 1}
+        if not in_flight:
+            updates.update(render_status=CV.RENDER_PENDING, render_updated_at=now)
+        CV.objects.filter(id=cv_id).update(**updates)
+
+    if not in_flight:
+        transaction.on_commit(lambda: render_cv_pdf.apply_async((cv_id,), countdown=CV_RENDER_DEBOUNCE_SECONDS))
+
+
+@shared_task
+def render_cv_pdf(cv_id):
+    """
+    Renders the latest state of a CV and notifies its owner once the PDF is ready.
+    """
+    while True:
+        with transaction.atomic():
+            state = CV.objects.select_for_update().filter(id=cv_id).values('render_version').first()
+            if state is None:
+                return
+            version = state['render_version']
+            CV.objects.filter(id=cv_id).update(render_status=CV.RENDER_RENDERING, render_updated_at=timezone.now())
+
+        cv = CV.objects.select_related('candidate', 'template').filter(id=cv_id).first()
+        if not cv:
+            return
+        try:
+            generate_cv_pdf(cv)
+            render_status = CV.RENDER_READY
+        except Exception as e:
+            print(f"Error rendering PDF for CV {cv_id}: {e}")
+            render_status = CV.RENDER_FAILED
+
+        updates = {'render_status': render_status, 'render_updated_at': timezone.now()}
+        if render_status == CV.RENDER_READY:
+            updates['rendered_version'] = version
+        # The version check makes this a no-op when the CV was edited during the render
+        if CV.objects.filter(id=cv_id, render_version=version).update(**updates):
+            break
+
+    send_user_notification(cv.candidate.user_id, {
+        "event": "cv_pdf_ready" if render_status == CV.RENDER_READY else "cv_pdf_failed",
+        "cv_id": cv.id,
+        "uid": str(cv.uid),
+        "version": version,
+        "generated_pdf": cv.generated_pdf.url if cv.generated_pdf else None,
+        "thumbnail": cv.thumbnail.url if cv.thumbnail else None,
+    })
@@ -1,3 +1,450 @@
-from django.test import TestCase
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Lower
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import fetch_engine
+from .models import (
+    CV, AbstractTemplate, CandidateJobRanking, CVData, Favorite, GeneralSetting, Job, JobClick, JobMatch, JobSearch,
+    Keyword, KeywordLocationCombination, Location, ScrapingSetting, SearchTerm, Template
+)
+from .tasks import finish_scraping_worker, scrape_combinations_worker, upsert_job_searches
+from .utils import (
+    CV_RENDER_BACKENDS, candidate_ranking_feed, cv_render_fingerprint, delete_unreferenced_cv_files, generate_cv_pdf, process_and_save_jobs
+)
+
+
+class JobFeedQueryCountTests(TestCase):
+    """
+    The feed endpoints build their score / applied / favorite maps with a fixed number of
+    queries, so the query count must not grow with the page size.
+    """
+    JOB_COUNT = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="feed@example.com", email="feed@example.com", password="secret")
+        cls.candidate = cls.user.candidate
+        GeneralSetting.objects.get_configuration()
+
+        jobs = Job.objects.bulk_create([
+            Job(title=f"Job {i}", company_name="PinJobs", original_url=f"https://example.com/jobs/{i}")
+            for i in range(cls.JOB_COUNT)
+        ])
+        base_cv = CV.objects.create(candidate=cls.candidate, cv_type=CV.BASE, name="Base CV")
+        tailored_cvs = [
+            CV.objects.create(candidate=cls.candidate, cv_type=CV.TAILORED, job=job, name=f"Tailored {job.id}")
+            for job in jobs
+        ]
+        # CVSerializer reads cv_data (language detection), every CV has one as in production
+        CVData.objects.bulk_create([
+            CVData(cv=cv, name="Feed Candidate", title=cv.name, work=[{"responsibilities": "Backend engineering with Django"}])
+            for cv in [base_cv] + tailored_cvs
+        ])
+        JobSearch.objects.bulk_create(
+            [JobSearch(cv=base_cv, job=job, similarity_score=70, is_applied=True) for job in jobs]
+            + [JobSearch(cv=cv, job=cv.job, similarity_score=85) for cv in tailored_cvs]
+        )
+        Favorite.objects.bulk_create([Favorite(candidate=cls.candidate, job=job) for job in jobs])
+        cls.job = jobs[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def count_queries(self, url, page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url_name):
+        url = reverse(url_name)
+        # Every page holds at least one job (the CV list starts with the job-less base CV)
+        counts = {page_size: self.count_queries(url, page_size) for page_size in (2, 5, self.JOB_COUNT)}
+        self.assertEqual(len(set(counts.values())), 1, f"{url_name} query counts by page size: {counts}")
+
+    def test_jobs_feed(self):
+        self.assertConstantQueries("candidate-jobs")
+
+    def test_favorite_jobs_feed(self):
+        self.assertConstantQueries("candidate-favorite-jobs")
+
+    def test_applied_jobs_feed(self):
+        self.assertConstantQueries("candidate-applied-jobs")
+
+    def test_cvs_feed(self):
+        self.assertConstantQueries("candidate-tailored-cvs")
+
+    def test_job_detail_maps(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("job-detail", args=[self.job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["similarity_scores"]), 2)
+        self.assertTrue(response.data["is_applied"])
+        self.assertTrue(response.data["is_favorite"])
+        # Candidate, job, scores and favorites
+        self.assertLessEqual(len(context.captured_queries), 4)
+
+
+class JobFeedCursorPaginationTests(TestCase):
+    """
+    Walking every cursor page returns each matching job exactly once, for each seek ordering.
+    """
+    JOB_COUNT = 40
+    PAGE_SIZE = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="cursor@example.com", email="cursor@example.com", password="secret")
+        GeneralSetting.objects.get_configuration()
+        # Varying term frequency and length spreads the search ranks, repeated ones make ties
+        cls.jobs = Job.objects.bulk_create([
+            Job(
+                title=f"Python developer {i}", company_name="PinJobs",
+                description=" ".join(["python"] * (i % 7 + 1) + ["backend"] * (i % 5)),
+                posted_date=None if i % 6 == 0 else f"2026-01-{i % 9 + 1:02d}",
+                original_url=f"https://example.com/jobs/{i}",
+            )
+            for i in range(cls.JOB_COUNT)
+        ])
+        # Every third job scored (with ties), some of the unscored ones pre-ranked locally
+        cv = CV.objects.create(candidate=cls.user.candidate, cv_type=CV.BASE, name="Base CV")
+        JobSearch.objects.bulk_create([
+            JobSearch(cv=cv, job=job, similarity_score=50 + i % 4 * 10) for i, job in enumerate(cls.jobs) if i % 3 == 0
+        ])
+        JobMatch.objects.bulk_create([
+            JobMatch(candidate=cls.user.candidate, job=job, score=(i % 5) / 10) for i, job in enumerate(cls.jobs) if i % 2 == 0
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def expected_similarity_order(self):
+        scores = dict(JobSearch.objects.values_list('job_id', 'similarity_score'))
+        matches = dict(JobMatch.objects.values_list('job_id', 'score'))
+        return [job.id for job in sorted(self.jobs, reverse=True, key=lambda job: (
+            scores.get(job.id, -1), matches.get(job.id, -1), job.posted_date or "0000", job.id
+        ))]
+
+    def walk_pages(self, **params):
+        ids = []
+        response = self.client.get(reverse("candidate-jobs"), {"page_size": self.PAGE_SIZE, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [item["id"] for item in response.data["results"] if not item["is_ad"]]
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def walk(self, **params):
+        ids = []
+        response = self.client.get(reverse("candidate-jobs"), {"pagination": "cursor", "page_size": self.PAGE_SIZE, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [item["id"] for item in response.data["results"] if not item["is_ad"]]
+            if not response.data["next"]:
+                return ids
+            response = self.client.get(response.data["next"])
+
+    def assertWalksEveryJobOnce(self, ids):
+        self.assertEqual(len(ids), len(set(ids)), "a job was returned on more than one page")
+        self.assertEqual(sorted(ids), sorted(job.id for job in self.jobs))
+
+    def test_search_cursor(self):
+        self.assertWalksEveryJobOnce(self.walk(search="python"))
+
+    def test_posted_date_cursor(self):
+        self.assertWalksEveryJobOnce(self.walk())
+
+    def test_similarity_cursor(self):
+        ids = self.walk(sort_by="similarity_score")
+        self.assertWalksEveryJobOnce(ids)
+        self.assertEqual(ids, self.expected_similarity_order())
+        self.assertEqual(self.walk(sort_by="similarity_score", search="python"), ids)
+
+    def test_similarity_pages(self):
+        ids = self.walk_pages(sort_by="similarity_score")
+        self.assertWalksEveryJobOnce(ids)
+        self.assertEqual(ids, self.expected_similarity_order())
+
+
+class UpsertJobSearchesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        candidate = User.objects.create_user(username="upsert@example.com", password="secret").candidate
+        cls.cv = CV.objects.create(candidate=candidate, cv_type=CV.BASE, name="Base CV")
+        cls.scored_job, cls.new_job = Job.objects.bulk_create([
+            Job(title="Scored", original_url="https://example.com/jobs/1"),
+            Job(title="New", original_url="https://example.com/jobs/2"),
+        ])
+        JobSearch.objects.create(cv=cls.cv, job=cls.scored_job, similarity_score=40, is_applied=True)
+
+    def test_existing_pair_is_updated_not_duplicated(self):
+        upsert_job_searches([
+            JobSearch(cv=self.cv, job=self.scored_job, similarity_score=90, last_scored_at=timezone.now()),
+            JobSearch(cv=self.cv, job=self.new_job, similarity_score=60, last_scored_at=timezone.now()),
+            JobSearch(cv=self.cv, job=self.new_job, similarity_score=65, last_scored_at=timezone.now()),
+        ])
+        self.assertEqual(JobSearch.objects.filter(cv=self.cv).count(), 2)
+        scored = JobSearch.objects.get(cv=self.cv, job=self.scored_job)
+        self.assertEqual(scored.similarity_score, 90)
+        self.assertTrue(scored.is_applied)
+        self.assertEqual(JobSearch.objects.get(cv=self.cv, job=self.new_job).similarity_score, 65)
+
+
+class CandidateJobRankingTriggerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.candidate = User.objects.create_user(username="ranking@example.com", password="secret").candidate
+        cls.other_candidate = User.objects.create_user(username="ranking2@example.com", password="secret").candidate
+        cls.base_cv = CV.objects.create(candidate=cls.candidate, cv_type=CV.BASE, name="Base CV")
+        cls.tailored_cv = CV.objects.create(candidate=cls.candidate, cv_type=CV.TAILORED, name="Tailored CV")
+        cls.job = Job.objects.create(title="Backend Engineer", original_url="https://example.com/jobs/1")
+
+    def best_score(self, candidate):
+        return CandidateJobRanking.objects.filter(candidate=candidate, job=self.job).values_list('best_score', flat=True).first()
+
+    def test_insert_update_and_delete(self):
+        base_search = JobSearch.objects.create(cv=self.base_cv, job=self.job, similarity_score=60)
+        self.assertEqual(self.best_score(self.candidate), 60)
+
+        tailored_search = JobSearch.objects.create(cv=self.tailored_cv, job=self.job, similarity_score=80)
+        self.assertEqual(self.best_score(self.candidate), 80)
+
+        JobSearch.objects.filter(id=tailored_search.id).update(similarity_score=50)
+        self.assertEqual(self.best_score(self.candidate), 60)
+
+        base_search.delete()
+        self.assertEqual(self.best_score(self.candidate), 50)
+
+        tailored_search.delete()
+        self.assertIsNone(self.best_score(self.candidate))
+
+    def test_cv_changing_candidate(self):
+        JobSearch.objects.create(cv=self.base_cv, job=self.job, similarity_score=60)
+        JobSearch.objects.create(cv=self.tailored_cv, job=self.job, similarity_score=80)
+
+        CV.objects.filter(id=self.tailored_cv.id).update(candidate=self.other_candidate)
+        self.assertEqual(self.best_score(self.candidate), 60)
+        self.assertEqual(self.best_score(self.other_candidate), 80)
+
+        CV.objects.filter(id=self.base_cv.id).update(candidate=self.other_candidate)
+        self.assertIsNone(self.best_score(self.candidate))
+        self.assertEqual(self.best_score(self.other_candidate), 80)
+
+
+@override_settings(SCRAPING_CONCURRENCY=1)
+@mock.patch("candidates.tasks.score_new_jobs.delay")
+@mock.patch("candidates.tasks.rank_jobs_for_candidates.delay")
+class ScrapeCombinationsWorkerTests(TestCase):
+    BUDGET = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        Keyword.objects.create(keyword="Django")
+        Location.objects.create(location="Paris")
+        cls.combination = KeywordLocationCombination.objects.get()
+        cls.run_started_at = timezone.now()
+        ScrapingSetting.objects.create(
+            num_jobs_to_scrape=cls.BUDGET, is_scraping=True, run_started_at=cls.run_started_at, active_workers=1
+        )
+
+    def run_worker(self, jobs, exhausted):
+        def scrape(keyword, location, budget, combination=None, collected=None, scraped_job_index=None):
+            collected.extend({"url": f"https://example.com/jobs/{i}"} for i in range(jobs))
+            return collected, exhausted
+
+        with mock.patch("candidates.tasks.scrape_jobs", side_effect=scrape), \
+                mock.patch("candidates.tasks.ScrapedJobIndex.load"):
+            scrape_combinations_worker(self.run_started_at.isoformat())
+        self.combination.refresh_from_db()
+
+    def test_exhausted_search_retires_the_combination(self, rank, score):
+        self.run_worker(jobs=2, exhausted=True)
+        self.assertTrue(self.combination.is_scraped)
+        self.assertIsNone(self.combination.claimed_at)
+
+    def test_search_cut_short_stays_claimable(self, rank, score):
+        self.run_worker(jobs=self.BUDGET, exhausted=False)
+        self.assertFalse(self.combination.is_scraped)
+        self.assertIsNone(self.combination.claimed_at)
+
+    def test_search_without_progress_backs_off(self, rank, score):
+        self.run_worker(jobs=0, exhausted=False)
+        self.assertFalse(self.combination.is_scraped)
+        self.assertIsNotNone(self.combination.claimed_at)
+        self.assertEqual(ScrapingSetting.objects.get().jobs_reserved, 0)
+
+    def test_last_worker_closes_the_run(self, rank, score):
+        self.run_worker(jobs=2, exhausted=True)
+        settings = ScrapingSetting.objects.get()
+        self.assertFalse(settings.is_scraping)
+        self.assertEqual(settings.active_workers, 0)
+        score.assert_called_once_with(self.run_started_at.isoformat())
+
+    def test_stale_run_worker_is_ignored(self, rank, score):
+        finish_scraping_worker((self.run_started_at - timedelta(hours=7)).isoformat())
+        settings = ScrapingSetting.objects.get()
+        self.assertTrue(settings.is_scraping)
+        self.assertEqual(settings.active_workers, 1)
+        rank.assert_not_called()
+        score.assert_not_called()
+
+
+@mock.patch.object(fetch_engine, "MAX_HOST_STATES", 3)
+@mock.patch.object(fetch_engine, "host_states", OrderedDict())
+class HostStateTests(SimpleTestCase):
+    def test_rotated_proxies_are_evicted_least_recently_used_first(self):
+        direct = fetch_engine.get_host_state("https://www.linkedin.com/jobs")
+        for i in range(5):
+            fetch_engine.get_host_state("https://www.linkedin.com/jobs", proxy=f"http://proxy-{i}")
+            self.assertIs(fetch_engine.get_host_state("https://www.linkedin.com/jobs/view/1"), direct)
+        self.assertEqual(len(fetch_engine.host_states), 3)
+        self.assertNotIn(("www.linkedin.com", "http://proxy-0"), fetch_engine.host_states)
+
+
+class ProcessAndSaveJobsTests(TestCase):
+    @staticmethod
+    def job_data(job_id, title):
+        return {
+            "title": title, "description": "Build APIs", "company_name": "PinJobs", "location": "Paris",
+            "original_url": f"https://www.linkedin.com/jobs/view/{job_id}?trk=public", "posted_date": "2026-01-02",
+        }
+
+    def test_skips_stored_and_duplicate_jobs(self):
+        Job.objects.create(title="Stored", original_url="https://www.linkedin.com/jobs/view/1001", job_id="1001")
+        with CaptureQueriesContext(connection) as context:
+            created = async_to_sync(process_and_save_jobs)([
+                self.job_data(1001, "Stored again"),
+                self.job_data(1002, "Backend Engineer"),
+                self.job_data(1002, "Backend Engineer"),
+                self.job_data(1003, "Data Engineer"),
+            ])
+        self.assertEqual(sorted(job.job_id for job in created), ["1002", "1003"])
+        self.assertEqual(Job.objects.get(job_id="1001").title, "Stored")
+        self.assertEqual(sorted(Job.objects.filter(job_id__in=["1002", "1003"]).values_list('title', flat=True)),
+                         ["Backend Engineer", "Data Engineer"])
+        # Existing ids, similar postings, then the insert inside its transaction
+        self.assertLessEqual(len(context.captured_queries), 5)
+
+
+class CVRenderFilesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        candidate = User.objects.create_user(username="render@example.com", password="secret").candidate
+        cls.cv = CV.objects.create(candidate=candidate, cv_type=CV.BASE, name="Base CV", template=Template.objects.create(
+            abstract_template=AbstractTemplate.objects.create(name="sydney", reference="sydney")
+        ))
+        CVData.objects.bulk_create([CVData(cv=cls.cv, name="Render Candidate", title="Backend Engineer")])
+
+    @staticmethod
+    def thumbnail_job(*args):
+        future = Future()
+        future.set_result(b"thumbnail")
+        return future
+
+    @override_settings(CV_RENDER_BACKEND="native")
+    def test_fallback_render_records_the_chrome_backend(self):
+        cv = CV.objects.select_related('template').get(id=self.cv.id)
+        with mock.patch.dict(CV_RENDER_BACKENDS, native=mock.Mock(side_effect=RuntimeError("no fonts"))), \
+                mock.patch("candidates.utils.render_cv_pdf_with_chrome", return_value=(b"%PDF-chrome", None)), \
+                mock.patch("candidates.utils.submit_cv_thumbnail", side_effect=self.thumbnail_job):
+            generate_cv_pdf(cv)
+        self.assertEqual(cv.render_fingerprint, cv_render_fingerprint(cv, "chrome"))
+        self.assertNotEqual(cv.render_fingerprint, cv_render_fingerprint(cv))
+        self.assertIn(cv.render_fingerprint, cv.generated_pdf.name)
+
+    def test_shared_file_is_kept_while_referenced(self):
+        name = default_storage.save("cvs/cv_shared.pdf", ContentFile(b"%PDF"))
+        other_cv = CV.objects.create(candidate=self.cv.candidate, cv_type=CV.TAILORED, name="Tailored CV")
+        CV.objects.filter(id=other_cv.id).update(generated_pdf=name)
+
+        delete_unreferenced_cv_files({"generated_pdf": name})
+        self.assertTrue(default_storage.exists(name))
+
+        CV.objects.filter(id=other_cv.id).update(generated_pdf=None)
+        delete_unreferenced_cv_files({"generated_pdf": name})
+        self.assertFalse(default_storage.exists(name))
+
+
+class HotPathQueryPlanTests(TestCase):
+    """
+    Plans of the hottest lookups with sequential scans disabled: a path without a usable index
+    still falls back to a Seq Scan, which fails the test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.candidate = User.objects.create_user(username="plans@example.com", password="secret").candidate
+        cls.job = Job.objects.create(title="Backend Engineer", original_url="https://example.com/jobs/1")
+        cls.cv = CV.objects.create(candidate=cls.candidate, cv_type=CV.BASE, name="Base CV")
+        JobSearch.objects.create(cv=cls.cv, job=cls.job, similarity_score=80, last_scored_at=timezone.now())
+        SearchTerm.objects.create(candidate=cls.candidate, term="Django")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertNoSeqScan(self, queryset, *tables):
+        plan = queryset.explain()
+        for table in tables:
+            self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+
+    def test_job_search_by_cv_and_job(self):
+        self.assertNoSeqScan(JobSearch.objects.filter(cv=self.cv, job=self.job), "candidates_jobsearch")
+
+    def test_job_searches_by_jobs_and_candidate(self):
+        queryset = JobSearch.objects.filter(job_id__in=[self.job.id], cv__candidate=self.candidate).values_list(
+            'job_id', 'cv_id', 'cv__cv_type', 'similarity_score', 'is_applied'
+        )
+        self.assertNoSeqScan(queryset, "candidates_jobsearch", "candidates_cv")
+
+    def test_job_searches_by_last_scored_at(self):
+        queryset = JobSearch.objects.filter(cv=self.cv, last_scored_at__lt=timezone.now() - timedelta(days=1))
+        self.assertNoSeqScan(queryset, "candidates_jobsearch")
+
+    def test_search_term_lookup(self):
+        queryset = SearchTerm.objects.alias(term_lower=Lower('term')).filter(
+            candidate=self.candidate, term_lower=Lower(Value("django"))
+        )
+        self.assertNoSeqScan(queryset, "candidates_searchterm")
+
+    def test_recent_search_terms(self):
+        queryset = SearchTerm.objects.filter(candidate=self.candidate, is_active=True).order_by('-last_searched_at')[:10]
+        self.assertNoSeqScan(queryset, "candidates_searchterm")
+
+    def test_similarity_feed_reads_the_ranking_index(self):
+        ranked, _ = candidate_ranking_feed(Job.objects.all(), self.candidate)
+        keys = ['feed_similarity_score', 'feed_match_score', 'feed_posted_date', 'feed_id']
+        plan = ranked.order_by(*[F(key).desc() for key in keys])[:30].explain()
+        self.assertIn("job_ranking_candidate_score", plan)
+        self.assertNotIn("Seq Scan on candidates_job", plan, plan)
+
+    def test_cv_by_candidate_and_type(self):
+        self.assertNoSeqScan(CV.objects.filter(candidate=self.candidate, cv_type=CV.BASE), "candidates_cv")
+
+    def test_favorites_by_candidate_and_jobs(self):
+        queryset = Favorite.objects.filter(candidate=self.candidate, job_id__in=[self.job.id])
+        self.assertNoSeqScan(queryset, "candidates_favorite")
+
+    def test_job_click_by_job_and_candidate(self):
+        self.assertNoSeqScan(JobClick.objects.filter(job=self.job, candidate=self.candidate), "candidates_jobclick")
+
+    def test_job_search_unique_per_cv_and_job(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            JobSearch.objects.create(cv=self.cv, job=self.job, similarity_score=50)
@@ -1,6 +1,11 @@
 import os
 import google.generativeai as genai
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.db.models import F, FilteredRelation, Q, Value
+from django.db.models.functions import Coalesce
 import random
 import platform
 import json
@@ -11,35 +16,44 @@ from dotenv import load_dotenv
 import psutil
 import shutil
 from .constants import *
-from .models import Job, JobSearch, CVData, CreditAction, CV
+from .models import Job, JobSearch, CVData, CreditAction, CV, Candidate, Favorite, CandidateJobRanking
 from django.core.files.storage import default_storage
+from django.utils.http import content_disposition_header
+from storages.backends.s3boto3 import S3Boto3Storage
 from paypalcheckoutsdk.core import PayPalHttpClient, SandboxEnvironment
 import re
 import asyncio
 import aiohttp
 from datetime import datetime
-import requests
 from fake_useragent import UserAgent
 from asgiref.sync import async_to_sync, sync_to_async
 from channels.layers import get_channel_layer
-from .serializers import CVDataSerializer
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from .serializers import CVDataSerializer, TemplateSerializer
+from .embeddings import embed_job
+from .fetch_engine import FetchEngine, RetryBudget
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
-from PIL import Image
+from PIL import Image, ImageOps
 from selenium.webdriver.chrome.service import Service
 import chromedriver_autoinstaller
 from django.core.files import File
 import base64
 import tempfile
 from django.core.files.base import ContentFile
+from django.template.loader import select_template
 from io import BytesIO
 from pdf2image import convert_from_bytes
-import string
+import math
+import threading
+import hashlib
+import atexit
+from contextlib import contextmanager
 from langdetect import detect, LangDetectException
 
 
@@ -75,6 +89,7 @@ Cookies = {
     "Cookie": 'JSESSIONID=ajax:7848041967472204636; lang=v=2&lang=en-us; bcookie="v=2&e5d26d20-ae1c-42bb-8d62-eb5447692036"; bscookie="v=1&20241215044610fbdb271d-e8b0-412d-89f6-da4f56e3a923AQGQvJZV9wbqclWCiMLwhnGu5ZFY4OmJ"; lidc="b=VGST00:s=V:r=V:a=V:p=V:g=3516:u=1:x=1:i=1734237970:t=1734324370:v=2:sig=AQEqO6q4wUsqR1mj-IwI8yHEBSAQ8KP-"; AMCVS_14215E3D5995C57C0A495C55%40AdobeOrg=1; _gcl_au=1.1.1133647765.1734241347; __cf_bm=ZHOfMYL0.WenI3RhHWMQsQ_mtspTnVnI3k0PTMf5HXA-1734256120-1.0.1.1-JDhdDn5NmYf6DZLz_972zyLhHGer_6BJgNUascersqKO6_1XuYayFLI1KYFVHDDWWGCqZnrX2SN1sd19AyHedQ; _uetsid=5da19ed0baa711efb7f4279e395081d5; _uetvid=5da1d750baa711ef9b0747d65465cd51; AMCV_14215E3D5995C57C0A495C55%40AdobeOrg=-637568504%7CMCIDTS%7C20073%7CMCMID%7C42801921487020161892225787033943760464%7CMCAAMLH-1734861054%7C6%7CMCAAMB-1734861054%7C6G1ynYcLPuiQxYZrsz_pkqfLG9yMXBpb2zX5dvJdYQJzPXImdj0y%7CMCOPTOUT-1734263454s%7CNONE%7CvVersion%7C5.1.1; aam_uuid=42990763440476163742174318049666117019; ccookie=0001AQH75bAWf2cLlgAAAZPJvkBI3nO8UfPNWap+B1Bi5NyQywHD5P5/ReAUufFnzFUWNIWC29YroQeNi+adBDegEOWdxb2VLF9zRAt1eZhwAyzc1IzyRkMl7GYBFO5I4AG2n9qDMyByiVAWIqg5H5TKSFkhzQgq7w9tySbyKqftOyuiSmT3; fid=AQFycxUlXPfaYAAAAZPJvnY71ClLx10eBwDihj-kYLKFBS2_tFZVSGZcPi6E4zls6nboUn5ijEDBCg; fcookie=AQHzA-Q_fb1ETwAAAZPJvn2PEGbbt4_aTcf_0tC-xvwRjXeTRYYARKJS6ZkgH5QVDWqcwMmsv13-vUy_cu37Q7yfDgjRRW8nHxd4uPqQvi6EkF2NLcfuSUx-VbfMwm5kgnFfQrcwIYoHOeMM5VtlmbomuW48IQHBkP_46sLhAwaL3D5KiyrU_ItamrG5HbCkrtaTqgLovTkEhUsK7Umkt2ECKBOJLzTTw7oAjNau1R7hPi6ZLxudK8FsKc5BUyNh43psSZId7Ijc41wd2QScRwS4yhaiu3oJgGSt7tl6ZMuPETaE925hp92c8IGjnXfMF3YqrcrFLnooc2uUT5dunNCR9N6fUTknjqXH/q+A1Ytg==',
     "Upgrade-Insecure-Requests": "1",
 }
+gemini_executor = ThreadPoolExecutor(max_workers=settings.GEMINI_MAX_CONCURRENCY, thread_name_prefix='gemini')
 PROXY_SOURCES = [
     "https://www.sslproxies.org/",
     "https://www.us-proxy.org/",
@@ -112,7 +127,7 @@ def extract_proxies(response_text):
     return proxies
 
 
-async def get_proxies_async():
+async def get_proxies_async(per_source=3, limit=10):
     async with aiohttp.ClientSession() as session:
         tasks = [fetch_html(session, url) for url in PROXY_SOURCES]
         responses = await asyncio.gather(*tasks)
@@ -120,9 +135,9 @@ async def get_proxies_async():
     for resp in responses:
         if resp:
             extracted = extract_proxies(resp)
-            selected = extracted[:3]
+            selected = extracted[:per_source]
             all_proxies.extend(selected)
-    return all_proxies[:10]
+    return all_proxies[:limit]
 
 
 def get_proxies():
@@ -130,18 +145,204 @@ def get_proxies():
     return asyncio.run(get_proxies_async())
 
 
-def get_gemini_response(prompt):
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.0-flash', generation_config=genai.GenerationConfig(temperature=0.0))
-    response = model.generate_content(prompt)
+class ProxyPool:
+    """
+    Long-lived pool of public proxies shared by every fetcher of the process.
+
+    A daemon thread refreshes the pool from PROXY_SOURCES every PROXY_POOL_REFRESH_INTERVAL
+    seconds. Each proxy keeps a moving average of its success rate and latency, proxies failing
+    PROXY_POOL_MAX_FAILURES times in a row are evicted, and selection is weighted towards fast,
+    reliable proxies while still giving new ones a chance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.proxies = {}
+        self.populated = threading.Event()
+        self.refresh_thread = None
+        self.pid = None
+
+    def ensure_started(self):
+        # Threads do not survive a fork, so each gunicorn/Celery child starts its own
+        with self.lock:
+            if self.refresh_thread and self.refresh_thread.is_alive() and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.refresh_thread = threading.Thread(target=self.refresh_loop, name='proxy-pool', daemon=True)
+            self.refresh_thread.start()
+
+    def refresh_loop(self):
+        while True:
+            self.refresh()
+            time.sleep(PROXY_POOL_REFRESH_INTERVAL)
+
+    def refresh(self):
+        try:
+            fresh_proxies = asyncio.run(get_proxies_async(per_source=PROXY_POOL_MAX_SIZE, limit=PROXY_POOL_MAX_SIZE))
+        except Exception as e:
+            print(f"Error refreshing proxy pool: {e}")
+            fresh_proxies = []
+        with self.lock:
+            for proxy in fresh_proxies:
+                self.proxies.setdefault(proxy, {"success": 0.5, "latency": 3.0, "failures": 0, "uses": 0})
+            # Keep the pool bounded, dropping the weakest proxies first
+            if len(self.proxies) > PROXY_POOL_MAX_SIZE:
+                ranked = sorted(self.proxies, key=lambda p: self.weight(self.proxies[p]), reverse=True)
+                for proxy in ranked[PROXY_POOL_MAX_SIZE:]:
+                    del self.proxies[proxy]
+        self.populated.set()
+
+    @staticmethod
+    def weight(stats):
+        return max(stats["success"], 0.05) / max(stats["latency"], 0.1)
+
+    def select(self, count, timeout=15):
+        """
+        Returns up to count distinct proxies, drawn at random weighted by health.
+        """
+        self.ensure_started()
+        self.populated.wait(timeout)
+        with self.lock:
+            candidates = list(self.proxies.items())
+        selected = []
+        while candidates and len(selected) < count:
+            weights = [self.weight(stats) for _, stats in candidates]
+            index = random.choices(range(len(candidates)), weights=weights)[0]
+            selected.append(candidates.pop(index)[0])
+        return selected
+
+    def report(self, proxy, success, latency):
+        with self.lock:
+            stats = self.proxies.get(proxy)
+            if stats is None:
+                return
+            stats["uses"] += 1
+            stats["success"] = 0.7 * stats["success"] + 0.3 * (1.0 if success else 0.0)
+            if success:
+                stats["failures"] = 0
+                stats["latency"] = 0.7 * stats["latency"] + 0.3 * latency
+            else:
+                stats["failures"] += 1
+                if stats["failures"] >= PROXY_POOL_MAX_FAILURES:
+                    del self.proxies[proxy]
+
+
+proxy_pool = ProxyPool()
+
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+gemini_models = {}
+gemini_registry_lock = threading.Lock()
+gemini_configured = False
+
+
+class GeminiUsage:
+    """
+    Process-wide counters for Gemini calls: call count, errors, latency and token usage.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = 0
+            self.errors = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+            self.last_latency = 0.0
+            self.prompt_tokens = 0
+            self.response_tokens = 0
+
+    def record(self, latency, response=None, failed=False):
+        usage = getattr(response, 'usage_metadata', None)
+        with self.lock:
+            self.calls += 1
+            self.errors += 1 if failed else 0
+            self.total_latency += latency
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, 'prompt_token_count', 0) or 0
+                self.response_tokens += getattr(usage, 'candidates_token_count', 0) or 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'avg_latency': self.total_latency / self.calls if self.calls else 0.0,
+                'max_latency': self.max_latency,
+                'last_latency': self.last_latency,
+                'prompt_tokens': self.prompt_tokens,
+                'response_tokens': self.response_tokens,
+            }
+
+
+gemini_usage = GeminiUsage()
+
+
+def get_gemini_model(model_name=GEMINI_MODEL_NAME, temperature=0.0, response_mime_type=None):
+    """
+    Returns a cached GenerativeModel for (model name, temperature, mime type).
+
+    The API key is configured once per process so the underlying client and its connection
+    are reused across calls and threads. Celery prefork children build their own registry
+    lazily after forking.
+    """
+    global gemini_configured
+    key = (model_name, temperature, response_mime_type)
+    model = gemini_models.get(key)
+    if model is not None:
+        return model
+
+    with gemini_registry_lock:
+        if not gemini_configured:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            gemini_configured = True
+        model = gemini_models.get(key)
+        if model is None:
+            generation_config = {"temperature": temperature}
+            if response_mime_type:
+                generation_config["response_mime_type"] = response_mime_type
+            model = genai.GenerativeModel(model_name, generation_config=genai.GenerationConfig(**generation_config))
+            gemini_models[key] = model
+    return model
+
+
+def generate_gemini_content(prompt, response_mime_type=None):
+    model = get_gemini_model(response_mime_type=response_mime_type)
+    started = time.perf_counter()
+    try:
+        response = model.generate_content(prompt)
+    except Exception:
+        gemini_usage.record(time.perf_counter() - started, failed=True)
+        raise
+    latency = time.perf_counter() - started
+    gemini_usage.record(latency, response)
+    usage = getattr(response, 'usage_metadata', None)
+    print(f"Gemini call took {latency:.2f}s "
+          f"(prompt tokens: {getattr(usage, 'prompt_token_count', 'N/A')}, "
+          f"response tokens: {getattr(usage, 'candidates_token_count', 'N/A')})")
     return response.text
 
 
+def get_gemini_response(prompt):
+    return generate_gemini_content(prompt)
+
+
+async def get_gemini_response_async(prompt):
+    """
+    Runs get_gemini_response on the dedicated Gemini executor so the event loop keeps running.
+    The executor size caps how many Gemini calls are in flight at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(gemini_executor, get_gemini_response, prompt)
+
+
 def get_gemini_json_response(prompt):
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.0-flash', generation_config=genai.GenerationConfig(temperature=0.0))
-    response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-    return response.text
+    return generate_gemini_content(prompt, response_mime_type="application/json")
 
 
 def get_temp_dir():
@@ -556,11 +757,88 @@ def construct_prompt(candidate_profile, jobs_data):
     return prompt
 
 
-def scrape_jobs(keyword, location, num_jobs_to_scrape):
-    # Read candidate profile
-    partial_jobs_collected = []
-    total_jobs_collected = []
-    anchors_processed = set()
+class ScrapedJobIndex:
+    """
+    In-memory membership index of the LinkedIn job ids already stored in the Job table.
+
+    Ids are kept as integers in a set; once the table outgrows SCRAPED_JOB_INDEX_BLOOM_THRESHOLD
+    rows the index switches to a Bloom filter, trading a small false-positive rate (a new job
+    skipped) for a fixed memory footprint. Lookups stay O(1) whatever the size of the table.
+    """
+
+    def __init__(self, expected_size=0):
+        self.ids = None
+        self.bits = None
+        if expected_size < SCRAPED_JOB_INDEX_BLOOM_THRESHOLD:
+            self.ids = set()
+            return
+        # Size the filter for twice the current table so it stays accurate while the run adds jobs
+        capacity = expected_size * 2
+        self.num_bits = int(-capacity * math.log(SCRAPED_JOB_INDEX_ERROR_RATE) / (math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray(self.num_bits // 8 + 1)
+
+    @classmethod
+    def load(cls):
+        """
+        Builds the index from the Job table in a single pass.
+        """
+        index = cls(Job.objects.count())
+        for job_id in Job.objects.filter(job_id__isnull=False).values_list('job_id', flat=True).iterator(chunk_size=10000):
+            index.add(job_id)
+        # Older rows were saved without job_id, fall back to the id embedded in their URL
+        for url in Job.objects.filter(job_id__isnull=True).values_list('original_url', flat=True).iterator(chunk_size=10000):
+            index.add(extract_job_id(url or ''))
+        return index
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    @staticmethod
+    def _normalize(job_id):
+        try:
+            return int(job_id)
+        except (TypeError, ValueError):
+            return None
+
+    def add(self, job_id):
+        key = self._normalize(job_id)
+        if key is None:
+            return
+        if self.ids is not None:
+            self.ids.add(key)
+            return
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, job_id):
+        key = self._normalize(job_id)
+        if key is None:
+            return False
+        if self.ids is not None:
+            return key in self.ids
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def scrape_jobs(keyword, location, num_jobs_to_scrape, combination=None, collected=None, scraped_job_index=None):
+    """
+    Scrapes LinkedIn jobs for a keyword/location pair and saves them through Gemini enrichment.
+
+    Search pages, job detail pages and Gemini enrichment run as bounded concurrent stages of a
+    single asyncio pipeline sharing one aiohttp session. When a KeywordLocationCombination is
+    given, its pagination cursor is persisted as pages complete, so an interrupted run resumes
+    from the last fully processed search page instead of starting over. Jobs are appended to
+    `collected` as they are fetched, so a caller still sees them if the run raises. Callers
+    scraping several combinations pass one ScrapedJobIndex for all of them, the run adds the
+    job ids it stores to it.
+
+    Returns the collected jobs and whether every page of the search was processed; a run cut
+    short by the budget or by failed pages is not exhausted and resumes from its cursor.
+    """
+    total_jobs_collected = collected if collected is not None else []
 
     # Construct the search URL
     multiple_jobs_url = construct_url(keyword, location)
@@ -573,54 +851,65 @@ def scrape_jobs(keyword, location, num_jobs_to_scrape):
         "Upgrade-Insecure-Requests": Cookies["Upgrade-Insecure-Requests"],
     }
 
-    def fetch_page_with_retry(url, headers, substring, max_retries=50):
-        for _ in range(max_retries):
-            r = requests.get(url, headers=headers)
-            if substring in r.text:
-                return r.text
-            else:
-                sleep_time = random.uniform(0, 3)
-                time.sleep(sleep_time)
-        return None
-
-    # Fetch and parse the job listings
-    jobs_data = []
+    def single_job_headers():
+        return {
+            "User-Agent": ua.random,
+            "Accept": Cookies["Accept"],
+            "Cookie": Cookies["Cookie"],
+            "Upgrade-Insecure-Requests": Cookies["Upgrade-Insecure-Requests"],
+        }
 
-    # Fetch the initial page
-    print(multiple_jobs_url)
-    initial_page_text = fetch_page_with_retry(multiple_jobs_url, multiple_jobs_headers, "job-search-card__listdate", 50)
-    if initial_page_text is None:
-        print("Failed to fetch initial page.")
-        return
+    # Index of already scraped job ids, loaded before entering the event loop unless shared by the caller
+    if scraped_job_index is None:
+        scraped_job_index = ScrapedJobIndex.load()
 
-    # Parse the initial page
-    soup = BeautifulSoup(initial_page_text, 'html.parser')
-    job_listings = soup.find_all('li')
+    # Jobs of this run past the budget cut; they only join the index once stored, so a job that
+    # fails before that is picked up again by the next run
+    admitted_job_ids = set()
 
-    # Get already scraped jobs (based on Job table)
-    already_scraped_urls = Job.objects.values_list('original_url', flat=True)
+    start_cursor = combination.scrape_cursor if combination else 0
 
-    # Extract total number of jobs from the title
-    title_tag = soup.find('title')
-    if title_tag:
-        title_text = title_tag.get_text()
-        match = re.search(r'(\d+)', title_text.replace(',', ''))
-        if match:
-            total_jobs = int(match.group(1))
-        else:
-            total_jobs = len(job_listings)
-    else:
-        total_jobs = len(job_listings)
+    @sync_to_async
+    def save_cursor(value):
+        if combination is None:
+            return
+        combination.scrape_cursor = value
+        combination.save(update_fields=['scrape_cursor'])
+
+    # Shared by every request of the run: per-host rate limiting, backoff and retry budget
+    fetch_engine = FetchEngine(
+        retry_budget=RetryBudget(SCRAPE_RETRY_BUDGET),
+        max_attempts=SCRAPE_MAX_ATTEMPTS,
+        max_soft_failures=SCRAPE_MAX_SOFT_FAILURES
+    )
+    # Proxies get fewer attempts each, a bad one is quickly replaced by the next from the pool
+    proxy_fetch_engine = FetchEngine(
+        retry_budget=fetch_engine.retry_budget, max_attempts=2, max_soft_failures=1, timeout=10
+    )
 
-    total_jobs = max(MAX_TOTAL, total_jobs)
+    async def fetch_through_proxy(session, url, build_headers, marker):
+        for proxy in await asyncio.to_thread(proxy_pool.select, 2):
+            started = time.perf_counter()
+            text = await proxy_fetch_engine.fetch_async(session, url, build_headers, marker, proxy=f"http://{proxy}")
+            proxy_pool.report(proxy, bool(text), time.perf_counter() - started)
+            if text:
+                return text
+        return None
 
-    # Calculate start values for pagination
-    start_values = list(range(0, total_jobs, 25))
+    def extract_total_jobs(soup):
+        # Extract total number of jobs from the title
+        title_tag = soup.find('title')
+        if title_tag:
+            match = re.search(r'(\d+)', title_tag.get_text().replace(',', ''))
+            if match:
+                return int(match.group(1))
+        return len(soup.find_all('li'))
 
     # Function to process job listings from a page
-    def process_job_listings(soup):
-        job_listings = soup.find_all('li')
-        for li in job_listings:
+    def process_job_listings(soup, start):
+        page_jobs = []
+        page_job_ids = set()
+        for li in soup.find_all('li'):
             base_card = li.find('div', class_='base-card')
             if base_card:
                 # Extract the href
@@ -629,136 +918,202 @@ def scrape_jobs(keyword, location, num_jobs_to_scrape):
                     job_url = a_tag['href']
                     if not job_url.startswith('http'):
                         job_url = 'https://www.linkedin.com' + job_url
-                    # Avoid duplicates
-                    job_url_no_query = job_url.split("?")[0]
-                    if job_url_no_query in anchors_processed or job_url_no_query in already_scraped_urls:
+                    # Avoid duplicates, both against the Job table and within this run
+                    job_id = extract_job_id(job_url.split("?")[0])
+                    if not job_id or job_id in scraped_job_index or job_id in admitted_job_ids or job_id in page_job_ids:
                         continue
-                    anchors_processed.add(job_url_no_query)
+                    page_job_ids.add(job_id)
                     # Extract datetime
                     time_tag = base_card.find('time', class_=re.compile('job-search-card__listdate'))
                     job_datetime_str = None
                     if time_tag and 'datetime' in time_tag.attrs:
                         job_datetime_str = time_tag['datetime']
-                    jobs_data.append({'url': job_url, 'date': job_datetime_str})
-
-    # Process initial page
-    # process_job_listings(soup)
-
-    # Fetch additional pages
-    for start in start_values:
-        # Construct paginated URL with adjusted path
-        paginated_url = construct_pagination_url(multiple_jobs_url, start)
-        page_text = fetch_page_with_retry(paginated_url, multiple_jobs_headers, "job-search-card__listdate", 50)
-        if page_text:
-            # The response is expected to be HTML snippets, so we can parse it directly
-            soup = BeautifulSoup(page_text, 'html.parser')
-            process_job_listings(soup)
-        else:
-            print(f"Failed to fetch page with start={start}")
-
-    # Now we have collected all jobs from the search results
-    # Sort jobs by date if needed
-    jobs_data.sort(key=lambda x: x['date'] or datetime.min, reverse=True)
-
-    # Now limit jobs_data to num_jobs_to_scrape
-    if len(jobs_data) > num_jobs_to_scrape:
-        jobs_data = jobs_data[:num_jobs_to_scrape]
-
-    # Now, fetch job details
-
-    async def fetch_job_detail(session, url, substring, max_retries=50):
-        for _ in range(max_retries):
-            try:
-                single_job_headers = {
-                    "User-Agent": ua.random,
-                    "Accept": Cookies["Accept"],
-                    "Cookie": Cookies["Cookie"],
-                    "Upgrade-Insecure-Requests": Cookies["Upgrade-Insecure-Requests"],
-                }
-                async with session.get(url, headers=single_job_headers) as response:
-                    text = await response.text()
-                    if substring in text:
-                        return text
-                    else:
-                        sleep_time = random.uniform(3, 15)
-                        await asyncio.sleep(sleep_time)
-            except Exception:
-                sleep_time = random.uniform(3, 15)
-                await asyncio.sleep(sleep_time)
-        return None
-
-    async def process_job(session, job):
-        # Construct the new job detail URL
-        job_detail_url = construct_job_detail_url(job['url'])
-        if not job_detail_url:
-            return
-        job_detail_text = await fetch_job_detail(session, job_detail_url, "top-card-layout__title", 100)
-        if job_detail_text:
-            # Parse the job detail page
-            job_soup = BeautifulSoup(job_detail_text, 'html.parser')
-            # Extract required data
-            title, company_name, loc, description = construct_job_description(job_soup)
-            # Collect data
-            job['title'] = title
-            job['company_name'] = company_name
-            job['location'] = location
-            job['description'] = description
-            job['original_url'] = job['url']
-            partial_jobs_collected.append(job)
-            total_jobs_collected.append(job)
-
-            print(f"Title: {title}")
-            print(f"Company: {company_name}")
-            print(f"Location: {location}")
-            print(f"Description: {description}")
-            print(f"Posted Date: {job['date'] if job['date'] else 'N/A'}")
-            print(f"Job URL: {job['url']}")
-            print("-" * 80)
-
-            # Process jobs in batches and send to Gemini
-            if len(partial_jobs_collected) == BATCH_SIZE:
-                for i in range(0, len(partial_jobs_collected), BATCH_SIZE):
-                    jobs_batch = partial_jobs_collected[i:i + BATCH_SIZE]
-                    prompt = construct_prompt_without_score(jobs_batch)
-                    gemini_response = get_gemini_response(prompt)
-                    if "```" in gemini_response:
-                        gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-                    try:
-                        jobs_with_scores = json.loads(gemini_response)
-                        print("Gemini Response:")
-                        print(json.dumps(jobs_with_scores, indent=4, ensure_ascii=False))
-                        # Create jobs and job searches in the database
-                        # for job_data in jobs_with_scores:
-                        #     await process_and_save_job(job_data)
-                        await asyncio.gather(
-                            *(process_and_save_job(job_data) for job_data in jobs_with_scores)
+                    page_jobs.append({'url': job_url, 'job_id': job_id, 'date': job_datetime_str, 'page': start})
+        return page_jobs
+
+    async def pipeline():
+        page_queue = asyncio.Queue()
+        detail_queue = asyncio.Queue()
+        enrichment_queue = asyncio.Queue()
+
+        # Per search page bookkeeping used to advance the persisted cursor
+        pending_jobs = {}
+        completed_pages = set()
+        state = {'cursor': start_cursor, 'admitted': 0, 'exhausted': False}
+
+        async def settle(start, count=1):
+            pending_jobs[start] -= count
+            if pending_jobs[start] > 0 or start in completed_pages:
+                return
+            completed_pages.add(start)
+            # Only move the cursor over a contiguous run of completed pages
+            cursor = state['cursor']
+            while cursor in completed_pages:
+                cursor += SEARCH_PAGE_SIZE
+            if cursor != state['cursor']:
+                state['cursor'] = cursor
+                await save_cursor(cursor)
+
+        async def page_worker(session):
+            while True:
+                start = await page_queue.get()
+                try:
+                    if state['admitted'] >= num_jobs_to_scrape:
+                        continue
+                    # Construct paginated URL with adjusted path
+                    paginated_url = construct_pagination_url(multiple_jobs_url, start)
+                    page_text = await fetch_engine.fetch_async(
+                        session, paginated_url, lambda: multiple_jobs_headers, "job-search-card__listdate"
+                    )
+                    if not page_text:
+                        # Left unsettled, the cursor stops here and the next run retries the page
+                        print(f"Failed to fetch page with start={start}")
+                        continue
+                    page_jobs = process_job_listings(BeautifulSoup(page_text, 'html.parser'), start)
+
+                    remaining = num_jobs_to_scrape - state['admitted']
+                    admitted_jobs = page_jobs[:remaining]
+                    state['admitted'] += len(admitted_jobs)
+                    admitted_job_ids.update(job['job_id'] for job in admitted_jobs)
+                    # A page cut short by the budget stays behind the cursor so the next run revisits it
+                    pending_jobs[start] = len(admitted_jobs) + (1 if len(admitted_jobs) < len(page_jobs) else 0)
+                    for job in admitted_jobs:
+                        detail_queue.put_nowait(job)
+                    if not admitted_jobs:
+                        pending_jobs[start] += 1
+                        await settle(start)
+                except Exception as e:
+                    print(f"Error processing search page start={start}: {e}")
+                finally:
+                    page_queue.task_done()
+
+        async def detail_worker(session):
+            while True:
+                job = await detail_queue.get()
+                try:
+                    # Construct the new job detail URL
+                    job_detail_url = construct_job_detail_url(job['url'])
+                    job_detail_text = None
+                    if job_detail_url:
+                        job_detail_text = await fetch_engine.fetch_async(
+                            session, job_detail_url, single_job_headers, "top-card-layout__title"
                         )
-                        partial_jobs_collected.clear()  # Clear the processed batch
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing Gemini response: {e}")
-                        print("Gemini response was:")
-                        print(gemini_response)
-        else:
-            print(f"Failed to fetch job detail for URL: {job_detail_url}")
-
-    async def main(jobs_data):
-        semaphore = asyncio.Semaphore(10)
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for job in jobs_data:
-                task = asyncio.ensure_future(bound_process_job(semaphore, session, job))
-                tasks.append(task)
-            await asyncio.gather(*tasks)
-
-    async def bound_process_job(semaphore, session, job):
-        async with semaphore:
-            await process_job(session, job)
+                        if not job_detail_text and job_detail_url not in fetch_engine.fatal_urls:
+                            job_detail_text = await fetch_through_proxy(
+                                session, job_detail_url, single_job_headers, "top-card-layout__title"
+                            )
+                    if not job_detail_text:
+                        print(f"Failed to fetch job detail for URL: {job_detail_url}")
+                        # A posting that is gone for good is settled, otherwise its page stays
+                        # pending so the cursor stops there and the next run retries the job
+                        if not job_detail_url or job_detail_url in fetch_engine.fatal_urls:
+                            await settle(job['page'])
+                        continue
 
-    # Run the main function to fetch job details
-    asyncio.run(main(jobs_data))
+                    # Parse the job detail page
+                    job_soup = BeautifulSoup(job_detail_text, 'html.parser')
+                    title, company_name, loc, description = construct_job_description(job_soup)
+                    job['title'] = title
+                    job['company_name'] = company_name
+                    job['location'] = location
+                    job['description'] = description
+                    job['original_url'] = job['url']
+                    total_jobs_collected.append(job)
+
+                    print(f"Title: {title}")
+                    print(f"Company: {company_name}")
+                    print(f"Location: {location}")
+                    print(f"Description: {description}")
+                    print(f"Posted Date: {job['date'] if job['date'] else 'N/A'}")
+                    print(f"Job URL: {job['url']}")
+                    print("-" * 80)
+
+                    enrichment_queue.put_nowait(job)
+                except Exception as e:
+                    print(f"Error processing job {job.get('url')}: {e}")
+                finally:
+                    detail_queue.task_done()
+
+        async def enrich_batch(jobs_batch):
+            # Send the batch to Gemini and save the structured jobs it returns
+            try:
+                prompt = construct_prompt_without_score(jobs_batch)
+                gemini_response = await get_gemini_response_async(prompt)
+                if "```" in gemini_response:
+                    gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
+                jobs_with_scores = json.loads(gemini_response)
+                await process_and_save_jobs(jobs_with_scores)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing Gemini response: {e}")
+                return
+            except Exception as e:
+                print(f"Error enriching job batch: {e}")
+                return
+            # Jobs of a failed batch, or left out of Gemini's answer, keep their page pending
+            saved_ids = {extract_job_id(job_data.get('original_url') or '') for job_data in jobs_with_scores}
+            for job in jobs_batch:
+                if job['job_id'] in saved_ids:
+                    scraped_job_index.add(job['job_id'])
+                    await settle(job['page'])
+
+        async def enrichment_worker():
+            # Batches are flushed as their own tasks so fetching and enrichment overlap
+            jobs_batch = []
+            flushes = set()
+            while True:
+                job = await enrichment_queue.get()
+                if job is None:
+                    break
+                jobs_batch.append(job)
+                if len(jobs_batch) == BATCH_SIZE:
+                    flush = asyncio.create_task(enrich_batch(jobs_batch))
+                    flushes.add(flush)
+                    flush.add_done_callback(flushes.discard)
+                    jobs_batch = []
+            if jobs_batch:
+                flushes.add(asyncio.create_task(enrich_batch(jobs_batch)))
+            await asyncio.gather(*flushes)
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            # Fetch the initial page
+            print(multiple_jobs_url)
+            initial_page_text = await fetch_engine.fetch_async(
+                session, multiple_jobs_url, lambda: multiple_jobs_headers, "job-search-card__listdate"
+            )
+            if initial_page_text is None:
+                print("Failed to fetch initial page.")
+                return False
+
+            total_jobs = max(MAX_TOTAL, extract_total_jobs(BeautifulSoup(initial_page_text, 'html.parser')))
+            start_values = list(range(start_cursor, total_jobs, SEARCH_PAGE_SIZE))
+            if start_cursor:
+                print(f"Resuming pagination from start={start_cursor}")
+            for start in start_values:
+                page_queue.put_nowait(start)
+
+            workers = [asyncio.create_task(page_worker(session)) for _ in range(SEARCH_PAGE_CONCURRENCY)]
+            workers += [asyncio.create_task(detail_worker(session)) for _ in range(JOB_DETAIL_CONCURRENCY)]
+            enricher = asyncio.create_task(enrichment_worker())
+
+            await page_queue.join()
+            await detail_queue.join()
+            enrichment_queue.put_nowait(None)
+            await enricher
+
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        # Every page of the search has been processed, the next run starts from scratch
+        if all(start in completed_pages for start in start_values):
+            state['exhausted'] = True
+            await save_cursor(0)
+        return state['exhausted']
+
+    exhausted = asyncio.run(pipeline())
 
     print("Scraping completed successfully.")
-    return total_jobs_collected
+    return total_jobs_collected, exhausted
 
 
 def is_valid_job_url(url):
@@ -775,45 +1130,53 @@ def is_valid_job_url(url):
     return False
 
 
-def fetch_description(url, proxy=None):
-    headers = {
+def job_description_headers():
+    return {
         "User-Agent": ua.random,
         "Accept": Cookies["Accept"],
         "Cookie": Cookies["Cookie"],
         "Upgrade-Insecure-Requests": Cookies["Upgrade-Insecure-Requests"]
     }
-    proxies = None
-    if proxy:
-        proxies = {
-            "http": proxy,
-            "https": proxy
-        }
+
+
+def fetch_description(url, proxy=None, fetch_engine=None):
+    fetch_engine = fetch_engine or FetchEngine(max_attempts=1, timeout=3)
+    description = None
+    started = time.perf_counter()
     try:
-        response = requests.get(url, headers=headers, proxies=proxies, timeout=3)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
+        text = fetch_engine.fetch(url, job_description_headers, "top-card-layout__title", proxy=proxy)
+        if text:
+            soup = BeautifulSoup(text, 'html.parser')
             # Assuming construct_job_description returns (_, _, _, description)
             _, _, _, description = construct_job_description(soup)
-            return description
-    except:
+    except Exception:
         pass
-    return None
+    if proxy:
+        proxy_pool.report(proxy, bool(description), time.perf_counter() - started)
+    return description
 
 
 def fetch_job_description(url, max_retries=100):
-    for _ in range(max_retries):
-        # Fetch new proxies every retry
-        proxies = get_proxies()
-        job_detail_url = construct_job_detail_url(url)
+    """
+    Fetches a job description directly and through proxies in parallel rounds. Every failed
+    attempt draws from a budget of max_retries, rounds back off exponentially, and a job
+    LinkedIn reports as gone (404/410) stops the search at once.
+    """
+    job_detail_url = construct_job_detail_url(url)
+    if not job_detail_url:
+        return None
+
+    fetch_engine = FetchEngine(retry_budget=RetryBudget(max_retries), max_attempts=2, max_soft_failures=1, timeout=3)
+    attempt = 0
+    while True:
+        # Draw the healthiest proxies from the shared pool
+        proxies = proxy_pool.select(PROXY_FANOUT)
 
         # Use a ThreadPoolExecutor to run requests concurrently
-        with ThreadPoolExecutor(max_workers=11) as executor:
-            futures = []
-            # 20 with proxies
-            for p in proxies:
-                futures.append(executor.submit(fetch_description, job_detail_url, p))
+        with ThreadPoolExecutor(max_workers=len(proxies) + 1) as executor:
+            futures = [executor.submit(fetch_description, job_detail_url, p, fetch_engine) for p in proxies]
             # 1 without proxy
-            futures.append(executor.submit(fetch_description, job_detail_url, None))
+            futures.append(executor.submit(fetch_description, job_detail_url, None, fetch_engine))
 
             # As soon as one completes, check result
             for future in as_completed(futures):
@@ -822,12 +1185,92 @@ def fetch_job_description(url, max_retries=100):
                     # We got a successful description
                     return result
 
-        # If we reach here, no success in this retry
-        # Wait and try again
-        time.sleep(random.uniform(3, 15))
+        if job_detail_url in fetch_engine.fatal_urls or not fetch_engine.retry_budget.consume():
+            return None
 
-    # If no success after all retries
-    return None
+        time.sleep(fetch_engine.backoff_delay(attempt))
+        attempt += 1
+
+
+async def fetch_description_async(session, url, proxy=None, timeout=JOB_LINK_ATTEMPT_TIMEOUT):
+    """
+    Single attempt at fetching and parsing a job description, reported to the proxy pool.
+    """
+    description = None
+    started = time.perf_counter()
+    try:
+        async with session.get(
+                url,
+                headers=job_description_headers(),
+                proxy=f"http://{proxy}" if proxy else None,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status == 200:
+                text = await response.text()
+                if "top-card-layout__title" in text:
+                    _, _, _, description = construct_job_description(BeautifulSoup(text, 'html.parser'))
+    except Exception:
+        pass
+    if proxy:
+        proxy_pool.report(proxy, bool(description), time.perf_counter() - started)
+    return description
+
+
+async def hedged_fetch_description(session, routes, hedge_delay=JOB_LINK_HEDGE_DELAY, deadline=JOB_LINK_FETCH_DEADLINE):
+    """
+    Hedged fetch over a list of (url, proxy) routes. The first route starts at once; the next
+    one starts whenever hedge_delay passes without an answer or a running attempt fails. The
+    first valid description wins, the other attempts are cancelled, and nothing outlives the
+    deadline.
+    """
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline
+    routes = list(routes)
+    pending = set()
+    next_route = 0
+
+    def launch():
+        nonlocal next_route
+        url, proxy = routes[next_route]
+        next_route += 1
+        pending.add(asyncio.create_task(fetch_description_async(session, url, proxy)))
+
+    try:
+        if routes:
+            launch()
+        while pending:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                return None
+            timeout = min(hedge_delay, remaining) if next_route < len(routes) else remaining
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                if task.result():
+                    return task.result()
+            # Either the hedge delay elapsed or an attempt failed: bring in the next route
+            if next_route < len(routes):
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_job_description_async(url, deadline=JOB_LINK_FETCH_DEADLINE, hedge_delay=JOB_LINK_HEDGE_DELAY):
+    """
+    Non-blocking counterpart of fetch_job_description for async views: a direct fetch first,
+    then hedged attempts through the healthiest pooled proxies, all bounded by the deadline.
+    """
+    job_detail_url = construct_job_detail_url(url)
+    if not job_detail_url:
+        return None
+
+    # Don't let a cold proxy pool eat into the deadline
+    proxies = await asyncio.to_thread(proxy_pool.select, PROXY_FANOUT, 1)
+    routes = [(job_detail_url, None)] + [(job_detail_url, proxy) for proxy in proxies] + [(job_detail_url, None)]
+    async with aiohttp.ClientSession() as session:
+        return await hedged_fetch_description(session, routes, hedge_delay=hedge_delay, deadline=deadline)
 
 
 def strip_html_tags(html_text):
@@ -1172,59 +1615,109 @@ def construct_only_score_job_prompt(candidate_profile, job_description):
     return prompt
 
 
+def detect_search_language(text):
+    """
+    Full-text search configuration matching the language of a job posting.
+    """
+    try:
+        return "french" if detect((text or "")[:2000]) == "fr" else "english"
+    except LangDetectException:
+        return "english"
+
+
 @sync_to_async
-def process_and_save_job(job_data):
+def process_and_save_jobs(jobs_data):
     """
-    Process and save a single job using Django ORM.
+    Process and save a batch of Gemini-enriched jobs using Django ORM.
+
+    Duplicates are resolved against existing rows in two queries, superseded postings are
+    removed in one delete and new jobs are written with a single bulk insert that ignores
+    conflicts on job_id. Returns the Job instances handed to the insert; ignore_conflicts leaves
+    them without a primary key.
     """
-    job_url_no_query = job_data['original_url'].split("?")[0]
-    job_id = extract_job_id(job_data['original_url'])
+    def parse_posted_date(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except (TypeError, ValueError):
+            return None
 
-    if not job_id:
-        return None
+    candidates_by_id = {}
+    for job_data in jobs_data:
+        job_id = extract_job_id(job_data.get('original_url') or '')
+        if job_id and job_id not in candidates_by_id:
+            candidates_by_id[job_id] = job_data
 
-    # Check if a job with the same job_id already exists
-    existing_job = Job.objects.filter(job_id=job_id).first()
+    if not candidates_by_id:
+        return []
 
-    if existing_job:
-        return None  # Skip creating a duplicate job with the same ID
+    # Skip jobs whose LinkedIn id is already stored
+    existing_ids = set(Job.objects.filter(job_id__in=candidates_by_id.keys()).values_list('job_id', flat=True))
+    for job_id in existing_ids:
+        candidates_by_id.pop(job_id, None)
 
-    # Check for jobs with the same title, company_name, and location
-    existing_similar_jobs = Job.objects.filter(
-        title=job_data['title'],
-        company_name=job_data['company_name'],
-        location=job_data['location']
-    )
+    if not candidates_by_id:
+        return []
 
-    if existing_similar_jobs.exists():
-        for similar_job in existing_similar_jobs:
-            # Check if the posted_date matches
-            if similar_job.posted_date == datetime.strptime(job_data['posted_date'], '%Y-%m-%d').date():
-                return None  # Skip creating a duplicate job with the same attributes
-
-            # Check if the new job's posted_date is more recent
-            if job_data.get('posted_date') and similar_job.posted_date:
-                if datetime.strptime(job_data['posted_date'], '%Y-%m-%d').date() > similar_job.posted_date:
-                    # Remove the older job
-                    similar_job.delete()
-
-    # Create a new job if no duplicate or outdated jobs are found
-    Job.objects.create(
-        title=job_data['title'],
-        description=job_data['description'],
-        company_name=job_data['company_name'],
-        location=job_data['location'],
-        salary_range=job_data.get('salary_range'),
-        min_salary=job_data.get('min_salary'),
-        max_salary=job_data.get('max_salary'),
-        employment_type=job_data.get('employment_type', 'full-time'),
-        original_url=job_url_no_query,
-        skills_required=job_data['skills_required'],
-        requirements=job_data['requirements'],
-        benefits=job_data['benefits'],
-        posted_date=job_data.get('posted_date'),
-        job_id=job_id
-    )
+    # Fetch every job sharing a (title, company_name, location) key with the batch at once
+    keys = {
+        (job_data.get('title'), job_data.get('company_name'), job_data.get('location'))
+        for job_data in candidates_by_id.values()
+    }
+    similar_filter = Q()
+    for title, company_name, location in keys:
+        similar_filter |= Q(title=title, company_name=company_name, location=location)
+    similar_jobs = {}
+    for row in Job.objects.filter(similar_filter).values('id', 'title', 'company_name', 'location', 'posted_date'):
+        similar_jobs.setdefault((row['title'], row['company_name'], row['location']), []).append(row)
+
+    jobs_to_create = []
+    ids_to_delete = set()
+    for job_id, job_data in candidates_by_id.items():
+        key = (job_data.get('title'), job_data.get('company_name'), job_data.get('location'))
+        posted_date = parse_posted_date(job_data.get('posted_date'))
+        similar_rows = similar_jobs.get(key, [])
+
+        # Skip creating a duplicate job with the same attributes
+        if any(row['posted_date'] == posted_date for row in similar_rows):
+            continue
+
+        # Remove older postings superseded by the new one
+        if posted_date:
+            ids_to_delete.update(
+                row['id'] for row in similar_rows if row['posted_date'] and posted_date > row['posted_date']
+            )
+
+        # Later jobs of the same batch are duplicates of this one
+        similar_jobs.setdefault(key, []).append({'id': None, 'posted_date': posted_date})
+
+        jobs_to_create.append(Job(
+            title=job_data['title'],
+            description=job_data['description'],
+            company_name=job_data['company_name'],
+            location=job_data['location'],
+            salary_range=job_data.get('salary_range'),
+            min_salary=job_data.get('min_salary'),
+            max_salary=job_data.get('max_salary'),
+            employment_type=job_data.get('employment_type', 'full-time'),
+            original_url=job_data['original_url'].split("?")[0],
+            skills_required=job_data.get('skills_required'),
+            requirements=job_data.get('requirements'),
+            benefits=job_data.get('benefits'),
+            posted_date=posted_date,
+            job_id=job_id
+        ))
+
+    for job in jobs_to_create:
+        job.embedding = embed_job(job)
+        job.search_language = detect_search_language(job.description)
+
+    with transaction.atomic():
+        if ids_to_delete:
+            Job.objects.filter(id__in=ids_to_delete).delete()
+        if jobs_to_create:
+            Job.objects.bulk_create(jobs_to_create, ignore_conflicts=True)
+
+    return jobs_to_create
 
 
 def construct_similarity_prompt(candidate_profile, jobs_data):
@@ -1299,29 +1792,318 @@ def construct_similarity_prompt(candidate_profile, jobs_data):
     return prompt
 
 
-def generate_cv_pdf(cv):
+def similarity_cache_key(candidate_profile, job_data):
     """
-    Generates and saves a PDF for the given CV instance and creates a thumbnail.
-    Removes any previously generated files for the CV.
+    Stable content hash of a (candidate profile, job) pair. The job id is left out so the same
+    posting content scores once whatever row it lives in.
     """
-    if not cv.cv_data or not cv.template:
-        raise ValueError("CV must have both data and template to generate PDF")
+    payload = json.dumps(
+        {"profile": candidate_profile, "job": {k: v for k, v in job_data.items() if k != "id"}},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return "similarity_score_" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def construct_job_scoring_data(job):
+    return {
+        "id": job.id,
+        "title": job.title,
+        "description": job.description,
+        "requirements": ', '.join(job.requirements or []),
+        "skills": ', '.join(job.skills_required or [])
+    }
+
+
+def estimate_tokens(value):
+    # Rough estimate of ~4 characters per token, good enough to pack prompts
+    return len(json.dumps(value, ensure_ascii=False, default=str)) // 4
+
+
+def pack_jobs_for_scoring(candidate_profile, jobs_data, token_budget=SCORING_PROMPT_TOKEN_BUDGET):
+    """
+    Splits jobs into groups that each fit, with the candidate profile, in one similarity prompt.
+    """
+    profile_tokens = estimate_tokens(candidate_profile) + 1500  # Scoring instructions
+    packs = []
+    current_pack = []
+    current_tokens = profile_tokens
+    for job_data in jobs_data:
+        job_tokens = estimate_tokens(job_data)
+        if current_pack and current_tokens + job_tokens > token_budget:
+            packs.append(current_pack)
+            current_pack = []
+            current_tokens = profile_tokens
+        current_pack.append(job_data)
+        current_tokens += job_tokens
+    if current_pack:
+        packs.append(current_pack)
+    return packs
+
+
+def wait_for_gemini_rate_limit():
+    """
+    Blocks until one more Gemini call fits in the GEMINI_REQUESTS_PER_MINUTE budget, counted in
+    the LLM cache so every worker sharing it shares the budget.
+    """
+    llm_cache = caches['llm']
+    if isinstance(llm_cache, LocMemCache):
+        print("WARNING: the llm cache is process-local, every process gets its own full Gemini budget")
+    while True:
+        key = f"gemini_rate_{int(time.time() // 60)}"
+        llm_cache.add(key, 0, timeout=120)
+        try:
+            count = llm_cache.incr(key)
+        except ValueError:
+            continue
+        if count <= settings.GEMINI_REQUESTS_PER_MINUTE:
+            return
+        time.sleep(60 - time.time() % 60 + random.uniform(0, 1))
+
+
+def get_similarity_scores(candidate_profile, jobs_data, rate_limited=False):
+    """
+    Returns [{"id": ..., "score": ...}] for the given jobs, only prompting Gemini for the
+    (profile, job) pairs that are not already in the LLM cache. Background callers pass
+    rate_limited=True to respect the shared Gemini budget.
+    """
+    llm_cache = caches['llm']
+    keys = {str(job["id"]): similarity_cache_key(candidate_profile, job) for job in jobs_data}
+    cached_scores = llm_cache.get_many(list(keys.values()))
+
+    scores = []
+    missing_jobs = []
+    for job in jobs_data:
+        key = keys[str(job["id"])]
+        if key in cached_scores:
+            scores.append({"id": job["id"], "score": cached_scores[key]})
+        else:
+            missing_jobs.append(job)
+
+    if missing_jobs:
+        prompt = construct_similarity_prompt(candidate_profile, missing_jobs)
+        if rate_limited:
+            wait_for_gemini_rate_limit()
+        gemini_response = get_gemini_response(prompt)
+        gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
+        missing_ids = {str(job["id"]) for job in missing_jobs}
+        scores_to_cache = {}
+        for score_data in json.loads(gemini_response):
+            job_id = str(score_data.get("id"))
+            if job_id not in missing_ids:
+                continue
+            scores_to_cache[keys[job_id]] = score_data.get("score")
+            scores.append(score_data)
+        llm_cache.set_many(scores_to_cache, timeout=settings.SIMILARITY_SCORE_CACHE_TIMEOUT)
 
+    return scores
+
+
+chromedriver_ready = False
+chromedriver_lock = threading.Lock()
+
+
+def ensure_chromedriver():
+    """
+    Installs the chromedriver matching the local Chrome once per process, not once per render.
+    """
+    global chromedriver_ready
+    if chromedriver_ready:
+        return
+    with chromedriver_lock:
+        if not chromedriver_ready:
+            chromedriver_autoinstaller.install()
+            chromedriver_ready = True
+
+
+class PooledBrowser:
+    """
+    A headless Chrome kept alive between renders. Each render runs in its own incognito browser
+    context, so no cache, cookies or storage leak from one CV to the next.
+    """
+
+    def __init__(self):
+        ensure_chromedriver()
+        self.driver = webdriver.Chrome(options=get_options())
+        self.base_handle = self.driver.current_window_handle
+        self.renders = 0
+        self.broken = False
+
+    def is_healthy(self):
+        if self.broken:
+            return False
+        try:
+            self.driver.switch_to.window(self.base_handle)
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def isolated_tab(self):
+        driver = self.driver
+        context_id = target_id = None
+        try:
+            context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+            target_id = driver.execute_cdp_cmd(
+                "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+            )["targetId"]
+            driver.switch_to.window(target_id)
+        except Exception as e:
+            # Incognito contexts unavailable, fall back to wiping the shared profile
+            print(f"Could not open an isolated browser context: {e}")
+            target_id = None
+            driver.switch_to.window(self.base_handle)
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        try:
+            yield driver
+        finally:
+            self.renders += 1
+            try:
+                if target_id:
+                    driver.close()
+                driver.switch_to.window(self.base_handle)
+                if context_id:
+                    driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+            except Exception as e:
+                print(f"Error cleaning up browser context: {e}")
+                self.broken = True
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class ChromePool:
+    """
+    Per-process pool of warm headless Chrome instances for PDF rendering.
+
+    At most CHROME_POOL_SIZE browsers exist at once. A browser is health-checked before each
+    checkout and recycled after CHROME_POOL_MAX_RENDERS renders, with its replacement launched
+    in the background so the next render does not pay Chrome's startup cost.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.idle = []
+        self.slots = threading.BoundedSemaphore(size)
+        self.pid = os.getpid()
+
+    def check_fork(self):
+        # Browsers launched by a parent process cannot be driven from a forked child
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.idle = []
+                self.slots = threading.BoundedSemaphore(self.size)
+
+    def warm(self):
+        """
+        Launches browsers until the pool holds CHROME_POOL_SIZE idle instances.
+        """
+        self.check_fork()
+        ensure_chromedriver()
+        with self.lock:
+            missing = self.size - len(self.idle)
+        for _ in range(missing):
+            self.replenish()
+
+    def replenish(self):
+        try:
+            browser = PooledBrowser()
+        except Exception as e:
+            print(f"Error launching pooled browser: {e}")
+            return
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(browser)
+                return
+        browser.quit()
+
+    def checkout(self):
+        while True:
+            with self.lock:
+                browser = self.idle.pop() if self.idle else None
+            if browser is None:
+                return PooledBrowser()
+            if browser.renders < CHROME_POOL_MAX_RENDERS and browser.is_healthy():
+                return browser
+            browser.quit()
+
+    def checkin(self, browser):
+        if browser.broken or browser.renders >= CHROME_POOL_MAX_RENDERS:
+            browser.quit()
+            threading.Thread(target=self.replenish, name='chrome-pool', daemon=True).start()
+            return
+        with self.lock:
+            self.idle.append(browser)
+
+    @contextmanager
+    def tab(self, timeout=CHROME_POOL_ACQUIRE_TIMEOUT):
+        """
+        Yields a driver focused on a fresh incognito tab of a pooled browser.
+        """
+        self.check_fork()
+        slots = self.slots
+        if not slots.acquire(timeout=timeout):
+            raise RuntimeError("No browser available for rendering, the Chrome pool is exhausted")
+        try:
+            browser = self.checkout()
+            try:
+                with browser.isolated_tab() as driver:
+                    yield driver
+            finally:
+                self.checkin(browser)
+        finally:
+            slots.release()
+
+    def close(self):
+        with self.lock:
+            browsers, self.idle = self.idle, []
+        if self.pid == os.getpid():
+            for browser in browsers:
+                browser.quit()
+
+
+chrome_pool = ChromePool(settings.CHROME_POOL_SIZE)
+atexit.register(chrome_pool.close)
+
+
+def cv_render_fingerprint(cv, backend=None):
+    """
+    Hash of everything a rendered CV shows: its data, its template settings, the version of
+    the abstract template design and the backend rendering it (the configured one by default).
+    CVs with the same fingerprint share the same stored files.
+    """
+    cv_data = dict(CVDataSerializer(cv.cv_data).data)
+    cv_data.pop("cv_id", None)
+    template = TemplateSerializer(cv.template).data
+    abstract_template = cv.template.abstract_template
+    payload = {
+        "engine": CV_RENDER_ENGINE_VERSION,
+        "backend": backend or resolve_cv_render_backend(),
+        "thumbnail": [settings.CV_THUMBNAIL_PRESET, settings.CV_THUMBNAIL_FORMAT],
+        "cv_data": cv_data,
+        "language": template.get("language"),
+        "template": template.get("templateData"),
+        "abstract_template_version": abstract_template.version if abstract_template else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def render_cv_pdf_with_chrome(cv):
+    """
+    Prints the frontend resume preview of a CV to PDF. Returns the PDF bytes and a PNG
+    screenshot of the first page at thumbnail width, taken from the already loaded page.
+    """
     # URL for the frontend resume preview
     url = f"{FRONTEND_PREVIEW_URL}{cv.id}"
     print(url)
-    chrome_options = get_options()
-    driver = None
-
-    try:
-        chromedriver_autoinstaller.install()
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get("chrome://settings/clearBrowserData")  # Open Chrome's clear cache settings
-        driver.execute_script("window.localStorage.clear();")  # Clear local storage
-        driver.execute_script("window.sessionStorage.clear();")  # Clear session storage
-        driver.execute_cdp_cmd("Network.clearBrowserCache", {})  # Clear browser cache using DevTools Protocol
-        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})  # Clear cookies for safety
 
+    with chrome_pool.tab() as driver:
         driver.get(url)
 
         # Wait for the container to appear
@@ -1340,47 +2122,511 @@ def generate_cv_pdf(cv):
         })
         pdf_data = base64.b64decode(response['data'])
 
-        # Remove previous files if they exist
-        # if cv.generated_pdf:
-        #     print(cv.generated_pdf)
-        #     old_pdf_path = os.path.join(settings.MEDIA_ROOT, cv.generated_pdf.name)
-        #     if os.path.exists(old_pdf_path):
-        #         os.remove(old_pdf_path)
-        #
-        # if cv.thumbnail:
-        #     print(cv.thumbnail)
-        #     old_thumbnail_path = os.path.join(settings.MEDIA_ROOT, cv.thumbnail.name)
-        #     if os.path.exists(old_thumbnail_path):
-        #         os.remove(old_thumbnail_path)
-
-        characters = string.ascii_letters + string.digits
-        random_string = "".join(random.choice(characters) for _ in range(5))
-
-        cv.generated_pdf.delete(save=False)  # Remove any in-memory reference
-        cv.thumbnail.delete(save=False)  # Remove any in-memory reference
-
-        # Save the new PDF to Django's storage
-        pdf_filename = f"cv_{cv.id}_{random_string}.pdf"
-        cv.generated_pdf.save(pdf_filename, ContentFile(pdf_data))
-
-        # Generate thumbnail directly from the PDF data (using `convert_from_bytes`)
-        images = convert_from_bytes(pdf_data, first_page=1, last_page=1)
-        thumbnail_filename = f"thumbnail_{cv.id}_{random_string}.png"
-        thumbnail_io = BytesIO()
-        images[0].save(thumbnail_io, format="PNG")
-        cv.thumbnail.save(thumbnail_filename, ContentFile(thumbnail_io.getvalue()))
-        mycv = CV.objects.filter(id=cv.id).first()
-        print("==============================================")
-        print(mycv.thumbnail)
-        print(mycv.generated_pdf)
-        # if cv.generated_pdf and default_storage.exists(cv.generated_pdf.name):
-        #     default_storage.delete(cv.generated_pdf.name)
-        #
-        # if cv.thumbnail and default_storage.exists(cv.thumbnail.name):
-        #     default_storage.delete(cv.thumbnail.name)
+        screenshot = None
+        try:
+            x, y, width = driver.execute_script(
+                "const rect = document.getElementsByClassName('container')[0].getBoundingClientRect();"
+                "return [rect.left + window.scrollX, rect.top + window.scrollY, rect.width];"
+            )
+            # Clip to the first A4 page and let Chrome rasterize straight at the thumbnail width
+            response = driver.execute_cdp_cmd("Page.captureScreenshot", {
+                "format": "png",
+                "captureBeyondViewport": True,
+                "clip": {
+                    "x": x, "y": y, "width": width, "height": width * 297 / 210,
+                    "scale": CV_THUMBNAIL_PRESETS[settings.CV_THUMBNAIL_PRESET] / width,
+                },
+            })
+            screenshot = base64.b64decode(response['data'])
+        except Exception as e:
+            print(f"Could not capture a thumbnail screenshot for CV {cv.id}: {e}")
+        return pdf_data, screenshot
+
+
+def first_value(entry, keys):
+    for key in keys:
+        value = entry.get(key)
+        if value:
+            return value
+    return None
+
+
+def normalize_cv_entry(entry):
+    """
+    Maps a work/education/project/... entry to the heading/subheading/period/body shape of the
+    native CV template, whatever keys the entry was stored with.
+    """
+    if not isinstance(entry, dict):
+        return {"heading": str(entry)}
+    body = first_value(entry, CV_ENTRY_BODY_KEYS)
+    if isinstance(body, (list, tuple)):
+        body = "\n".join(str(item) for item in body)
+    start = entry.get("start_date") or entry.get("from")
+    end = entry.get("end_date") or entry.get("to")
+    return {
+        "heading": first_value(entry, CV_ENTRY_HEADING_KEYS),
+        "subheading": first_value(entry, CV_ENTRY_SUBHEADING_KEYS),
+        "period": " - ".join(str(date) for date in (start, end) if date) or entry.get("date"),
+        "body": body,
+    }
+
+
+def cv_tag_label(item):
+    if not isinstance(item, dict):
+        return str(item)
+    label = first_value(item, CV_TAG_KEYS)
+    level = item.get("level")
+    return f"{label} ({level})" if label and level else label
+
+
+def build_cv_render_context(cv):
+    """
+    Template context for the native renderer, built from the same serializers the frontend
+    preview reads through CVDetailView.
+    """
+    cv_data = CVDataSerializer(cv.cv_data).data
+    template = TemplateSerializer(cv.template).data
+    template_data = template.get("templateData") or {}
+    page = template_data.get("page") or {}
+    personnel = template_data.get("personnel") or {}
+    typography = template_data.get("typography") or {}
+
+    contact = [
+        cv_data.get(field) for field in ("email", "phone", "city", "age")
+        if personnel.get(field, True) and cv_data.get(field)
+    ]
+
+    sections = []
+    for settings_key, field in CV_RENDER_ENTRY_SECTIONS:
+        section_settings = template_data.get(settings_key) or {}
+        entries = cv_data.get(field) or []
+        if section_settings.get("visible", True) and isinstance(entries, list) and entries:
+            sections.append({
+                "name": section_settings.get("name") or settings_key.title(),
+                "entries": [normalize_cv_entry(entry) for entry in entries],
+            })
+
+    tag_sections = []
+    for settings_key, field in CV_RENDER_TAG_SECTIONS:
+        section_settings = template_data.get(settings_key) or {}
+        items = cv_data.get(field) or []
+        tags = [label for label in (cv_tag_label(item) for item in items if item) if label] if isinstance(items, list) else []
+        if section_settings.get("visible", True) and tags:
+            tag_sections.append({"name": section_settings.get("name") or settings_key.title(), "tags": tags})
+
+    family = (typography.get("family") or "open-sans").replace("-", " ").title()
+    return {
+        "language": template.get("language") or "en",
+        "name": cv_data.get("name") if personnel.get("name", True) else "",
+        "headline": cv_data.get("headline"),
+        "summary": cv_data.get("summary"),
+        "contact": contact,
+        "sections": sections,
+        "tag_sections": tag_sections,
+        "page": page,
+        "page_size": "letter" if page.get("format") == "letter" else "A4",
+        "theme": template_data.get("theme") or DEFAULT_TEMPLATE_DATA["theme"],
+        "typography": typography,
+        "font_family": f"'{family}', sans-serif",
+        # The frontend sizes are for screen, scaled down to print sizes
+        "font_size": max(8, int(typography.get("size") or 16) * 0.75),
+        "line_height": max(1.0, float(typography.get("lineHeight") or 2) * 0.75),
+    }
+
+
+def render_cv_pdf_native(cv):
+    """
+    Renders a CV to PDF in-process from its CVData and Template, with no browser or frontend
+    round-trip. Abstract templates can ship their own templates/cv/<name>.html.
+    """
+    from weasyprint import HTML
+
+    abstract_template = cv.template.abstract_template
+    template_names = [f"cv/{abstract_template.name}.html"] if abstract_template else []
+    html = select_template(template_names + ["cv/default.html"]).render(build_cv_render_context(cv))
+    return HTML(string=html).write_pdf(), None
+
+
+CV_RENDER_BACKENDS = {
+    "chrome": render_cv_pdf_with_chrome,
+    "native": render_cv_pdf_native,
+}
+
+
+def resolve_cv_render_backend(backend=None):
+    """
+    Name of the backend used for a requested one, unknown names render with Chrome.
+    """
+    backend = backend or settings.CV_RENDER_BACKEND
+    return backend if backend in CV_RENDER_BACKENDS else "chrome"
+
+
+def render_cv(cv, backend=None):
+    """
+    Renders a CV with the configured backend, falling back to Chrome if the native one fails.
+    Returns the PDF bytes, a first page screenshot when the backend provides one and the name
+    of the backend that actually rendered the CV.
+    """
+    backend = resolve_cv_render_backend(backend)
+    if backend == "chrome":
+        return (*render_cv_pdf_with_chrome(cv), backend)
+    try:
+        return (*CV_RENDER_BACKENDS[backend](cv), backend)
+    except Exception as e:
+        print(f"Error rendering CV {cv.id} with the {backend} backend, falling back to Chrome: {e}")
+        return (*render_cv_pdf_with_chrome(cv), "chrome")
+
+
+def make_cv_thumbnail(pdf_data, screenshot, width, image_format):
+    """
+    Builds a thumbnail of the first page at the given width. Runs in the thumbnail process pool.
+    """
+    if screenshot:
+        image = Image.open(BytesIO(screenshot))
+        if image.width != width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    else:
+        # Let poppler rasterize at the target size instead of full size at the default DPI
+        image = convert_from_bytes(pdf_data, first_page=1, last_page=1, size=(width, None), use_pdftocairo=True)[0]
+
+    thumbnail_io = BytesIO()
+    if image_format == "webp":
+        image.convert("RGB").save(thumbnail_io, format="WEBP", quality=80, method=4)
+    else:
+        image.convert("RGB").save(thumbnail_io, format="JPEG", quality=85, optimize=True, progressive=True)
+    return thumbnail_io.getvalue()
+
+
+thumbnail_executor = None
+thumbnail_executor_pid = None
+thumbnail_executor_lock = threading.Lock()
+
+
+def get_thumbnail_executor(reset=False):
+    global thumbnail_executor, thumbnail_executor_pid
+    with thumbnail_executor_lock:
+        # A pool created before a fork belongs to the parent process
+        if reset or thumbnail_executor is None or thumbnail_executor_pid != os.getpid():
+            thumbnail_executor = ProcessPoolExecutor(max_workers=settings.CV_THUMBNAIL_WORKERS)
+            thumbnail_executor_pid = os.getpid()
+        return thumbnail_executor
+
+
+def submit_cv_thumbnail(pdf_data, screenshot=None):
+    """
+    Starts building a CV thumbnail in the thumbnail process pool and returns its future, so the
+    caller can upload the PDF meanwhile. Falls back to building it inline when no pool can run.
+    """
+    args = (pdf_data, screenshot, CV_THUMBNAIL_PRESETS[settings.CV_THUMBNAIL_PRESET], settings.CV_THUMBNAIL_FORMAT)
+    try:
+        try:
+            return get_thumbnail_executor().submit(make_cv_thumbnail, *args)
+        except BrokenProcessPool:
+            return get_thumbnail_executor(reset=True).submit(make_cv_thumbnail, *args)
+    except Exception as e:
+        print(f"Thumbnail pool unavailable, building the thumbnail inline: {e}")
+        future = Future()
+        try:
+            future.set_result(make_cv_thumbnail(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+def lock_cv_files(*names):
+    """
+    Locks stored CV file names until the end of the current transaction. Files are shared by
+    fingerprint, so reusing a file and deleting it as unreferenced must not interleave; a row
+    lock cannot cover a file that no CV references yet, hence Postgres advisory locks.
+    """
+    with connection.cursor() as cursor:
+        # A fixed order keeps two lockers of the same names from deadlocking
+        for name in sorted(set(filter(None, names))):
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+
+
+def delete_unreferenced_cv_files(names_by_field):
+    """
+    Deletes previously stored CV files that no CV points to anymore.
+    """
+    for field, name in names_by_field.items():
+        if not name:
+            continue
+        with transaction.atomic():
+            lock_cv_files(name)
+            if CV.objects.filter(**{field: name}).exists():
+                continue
+            try:
+                default_storage.delete(name)
+            except Exception as e:
+                print(f"Error deleting {name}: {e}")
+
+
+def generate_cv_pdf(cv):
+    """
+    Generates and saves a PDF for the given CV instance and creates a thumbnail.
+
+    Files are stored under the CV's render fingerprint: a CV whose visible state did not change
+    is not rendered again, and a state already rendered for another CV reuses its files.
+    Previous files are removed once no CV references them.
+    """
+    if not cv.cv_data or not cv.template:
+        raise ValueError("CV must have both data and template to generate PDF")
+
+    fingerprint = cv_render_fingerprint(cv)
+    if cv.render_fingerprint == fingerprint and cv.generated_pdf and cv.thumbnail:
+        print(f"CV {cv.id} unchanged since its last render, skipping")
+        return
+
+    def file_names(fingerprint):
+        return (
+            cv.generated_pdf.field.generate_filename(cv, f"cv_{fingerprint}.pdf"),
+            cv.thumbnail.field.generate_filename(cv, f"thumbnail_{fingerprint}.{settings.CV_THUMBNAIL_FORMAT}"),
+        )
+
+    previous_files = {"generated_pdf": cv.generated_pdf.name, "thumbnail": cv.thumbnail.name}
+
+    def save_render(fingerprint, pdf_name, thumbnail_name):
+        cv.generated_pdf.name = pdf_name
+        cv.thumbnail.name = thumbnail_name
+        cv.render_fingerprint = fingerprint
+        # Only write the artifacts, render bookkeeping on the row may have moved on meanwhile
+        cv.save(update_fields=["generated_pdf", "thumbnail", "render_fingerprint", "updated_at"])
+
+    pdf_name, thumbnail_name = file_names(fingerprint)
+    # The stored files can't be cleaned up between the existence check and the CV pointing at them
+    with transaction.atomic():
+        lock_cv_files(pdf_name, thumbnail_name)
+        reused = default_storage.exists(pdf_name) and default_storage.exists(thumbnail_name)
+        if reused:
+            print(f"Reusing stored render {fingerprint} for CV {cv.id}")
+            save_render(fingerprint, pdf_name, thumbnail_name)
+
+    if not reused:
+        pdf_data, screenshot, backend = render_cv(cv)
+        # A fallback render differs from what the configured backend would produce
+        if backend != resolve_cv_render_backend():
+            fingerprint = cv_render_fingerprint(cv, backend)
+            pdf_name, thumbnail_name = file_names(fingerprint)
+        thumbnail_job = submit_cv_thumbnail(pdf_data, screenshot)
+        with transaction.atomic():
+            lock_cv_files(pdf_name, thumbnail_name)
+            pdf_name = default_storage.save(pdf_name, ContentFile(pdf_data))
+            thumbnail_name = default_storage.save(thumbnail_name, ContentFile(thumbnail_job.result()))
+            save_render(fingerprint, pdf_name, thumbnail_name)
+
+    delete_unreferenced_cv_files({
+        field: name for field, name in previous_files.items() if name not in (pdf_name, thumbnail_name)
+    })
+
+
+def parse_range_header(header, size):
+    """
+    Parses a single "bytes=" range of a Range header into inclusive (start, end) offsets.
+    Returns None when the header is missing, malformed or asks for several ranges, in which
+    case the whole file is served. A start past the end of the file means unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        suffix_length = int(last)
+        return (max(0, size - suffix_length), size - 1) if suffix_length else (size, size)
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def iter_stored_file(stored_file, start, end, chunk_size=CV_DOWNLOAD_CHUNK_SIZE):
+    """
+    Yields bytes start..end of an opened storage file in chunks. S3 objects are read with a
+    ranged GetObject and relayed as they arrive, so the web worker never holds the whole file.
+    """
+    try:
+        if end < start:
+            return
+        if hasattr(stored_file, "obj"):
+            body = stored_file.obj.get(Range=f"bytes={start}-{end}")["Body"]
+            yield from body.iter_chunks(chunk_size)
+            return
+        stored_file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = stored_file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
     finally:
-        if driver:
-            driver.quit()
+        stored_file.close()
+
+
+presigned_storage = None
+
+
+def get_presigned_download_url(name, filename):
+    """
+    Short-lived signed URL serving a stored file as an attachment, or None when the default
+    storage is not S3. Media URLs are otherwise unsigned (AWS_QUERYSTRING_AUTH is off).
+    """
+    global presigned_storage
+    if not isinstance(default_storage, S3Boto3Storage):
+        return None
+    if presigned_storage is None:
+        presigned_storage = S3Boto3Storage(querystring_auth=True, querystring_expire=CV_DOWNLOAD_URL_EXPIRY)
+    return presigned_storage.url(name, parameters={
+        "ResponseContentDisposition": content_disposition_header(True, filename),
+        "ResponseContentType": "application/pdf",
+    })
+
+
+rendition_storage = None
+
+
+def get_rendition_storage():
+    """
+    Storage for derived images whose names change with their content, uploaded with
+    long-lived cache headers.
+    """
+    global rendition_storage
+    if rendition_storage is None:
+        if isinstance(default_storage, S3Boto3Storage):
+            rendition_storage = S3Boto3Storage(object_parameters={"CacheControl": PROFILE_PICTURE_CACHE_CONTROL})
+        else:
+            rendition_storage = default_storage
+    return rendition_storage
+
+
+def generate_profile_picture_renditions(candidate):
+    """
+    Resizes a candidate's profile picture into the PROFILE_PICTURE_SIZES squares once, on upload.
+    Renditions are named after a hash of the original so browsers can cache them for good,
+    and the previous ones are removed.
+    """
+    storage = get_rendition_storage()
+    renditions = {}
+    if candidate.profile_picture and candidate.profile_picture.name:
+        with candidate.profile_picture.open("rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for size in PROFILE_PICTURE_SIZES:
+            name = f"profile_pictures/renditions/{candidate.id}_{digest}_{size}.webp"
+            if not storage.exists(name):
+                rendition_io = BytesIO()
+                ImageOps.fit(image, (size, size), Image.LANCZOS).save(rendition_io, format="WEBP", quality=85)
+                name = storage.save(name, ContentFile(rendition_io.getvalue()))
+            renditions[str(size)] = name
+
+    previous_renditions = candidate.profile_picture_renditions or {}
+    candidate.profile_picture_renditions = renditions or None
+    Candidate.objects.filter(id=candidate.id).update(profile_picture_renditions=candidate.profile_picture_renditions)
+    for name in previous_renditions.values():
+        if name not in renditions.values():
+            try:
+                storage.delete(name)
+            except Exception as e:
+                print(f"Error deleting rendition {name}: {e}")
+    return renditions
+
+
+def send_user_notification(user_id, message):
+    """
+    Pushes a message to the user's NotificationConsumer websocket group.
+    """
+    channel_layer = get_channel_layer()
+    if not channel_layer or not user_id:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f"notifications_{user_id}",
+            {"type": "send_notification", "message": message}
+        )
+    except Exception as e:
+        print(f"Error sending notification to user {user_id}: {e}")
+
+
+def estimate_queryset_count(queryset):
+    """
+    Planner row estimate for a queryset (EXPLAIN without ANALYZE, nothing is scanned), for lists
+    where an exact COUNT(*) costs as much as the page itself.
+    """
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan['Plan']['Plan Rows'])
+    except Exception as e:
+        print(f"Error estimating row count: {e}")
+        return None
+
+
+def candidate_ranking_feed(jobs, candidate):
+    """
+    Splits the similarity feed into its two ordered segments, both annotated with the non-null
+    feed_* keys it sorts on (descending): the jobs the candidate's CVs scored, read from
+    CandidateJobRanking so a page is a LIMIT over its (candidate, -best_score) index, then the
+    jobs no CV scored yet, by local match score. Ranked rows carry their Job in .job.
+    """
+    ranked = CandidateJobRanking.objects.filter(candidate=candidate)
+    if jobs.query.has_filters():
+        ranked = ranked.filter(job__in=jobs.values('id'))
+    ranked = ranked.select_related('job').defer('job__embedding', 'job__search_vector').annotate(
+        match=FilteredRelation('job__job_matches', condition=Q(job__job_matches__candidate=candidate)),
+    ).annotate(
+        feed_similarity_score=F('best_score'),
+        feed_match_score=Coalesce('match__score', Value(-1.0)),
+        feed_posted_date=Coalesce('job__posted_date', Value(Job.FEED_NULL_DATE)),
+        feed_id=F('job_id'),
+    )
+    # Scores are never negative, so the unscored jobs sort after every ranked one
+    unranked = jobs.exclude(candidate_rankings__candidate=candidate).annotate(
+        match=FilteredRelation('job_matches', condition=Q(job_matches__candidate=candidate)),
+    ).annotate(
+        feed_similarity_score=Value(-1.0),
+        feed_match_score=Coalesce('match__score', Value(-1.0)),
+        feed_posted_date=Coalesce('posted_date', Value(Job.FEED_NULL_DATE)),
+        feed_id=F('id'),
+    )
+    return ranked, unranked
+
+
+def feed_jobs(rows):
+    """
+    Jobs of a feed page mixing CandidateJobRanking rows and Job rows.
+    """
+    return [row.job if isinstance(row, CandidateJobRanking) else row for row in rows]
+
+
+def build_job_context_maps(candidate, job_ids, include_favorites=True):
+    """
+    Builds the similarity_scores_map / applies_map / favorites_map context JobSerializer reads,
+    in one values() query over the candidate's JobSearch rows plus one for favorites.
+    """
+    job_ids = list(job_ids)
+    similarity_scores_map = {}
+    applies_map = {}
+    job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=candidate).values_list(
+        'job_id', 'cv_id', 'cv__cv_type', 'similarity_score', 'is_applied'
+    )
+    for job_id, cv_id, cv_type, score, is_applied in job_searches:
+        similarity_scores_map.setdefault(job_id, []).append({
+            'cv_id': cv_id,
+            'type': cv_type,
+            'score': int(score)
+        })
+        applies_map[job_id] = applies_map.get(job_id, False) or is_applied
+
+    context = {'similarity_scores_map': similarity_scores_map, 'applies_map': applies_map}
+    if include_favorites:
+        favorite_job_ids = set(
+            Favorite.objects.filter(candidate=candidate, job_id__in=job_ids).values_list('job_id', flat=True)
+        )
+        context['favorites_map'] = {job_id: job_id in favorite_job_ids for job_id in job_ids}
+    return context
 
 
 def construct_career_guidance_prompt(candidate_profile, stepper_responses, languages, num_of_careers_to_generate=5):
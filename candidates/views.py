@@ -17,23 +17,31 @@ from rest_framework.decorators import action
 import requests
 from django.db.models.signals import post_save
 from django.conf import settings
-import os
 from .utils import (get_gemini_response, deduct_credits, has_sufficient_credits, construct_only_score_job_prompt,
-                    construct_similarity_prompt, generate_cv_pdf, construct_career_guidance_prompt, robust_json_repair,
+                    get_similarity_scores, construct_career_guidance_prompt, robust_json_repair,
                     construct_tailored_career_prompt, detect_cv_language, get_gemini_json_response)
 import json
-from .tasks import run_scraping_task
+from .tasks import run_scraping_task, enqueue_cv_render
 from django.contrib.auth import authenticate
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import update_session_auth_hash
 import django_filters
-from django.db.models import F, Subquery, OuterRef, Q
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import F, Q, Value, DecimalField
+from django.db.models.functions import Coalesce, Cast
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from rest_framework.pagination import PageNumberPagination, BasePagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from django.core.serializers.json import DjangoJSONEncoder
+import base64
 from datetime import datetime
-from .utils import (paypal_client, is_valid_job_url, fetch_job_description, construct_tailored_job_prompt,
-                    construct_single_job_prompt, construct_candidate_profile, extract_job_id)
+from .utils import (paypal_client, is_valid_job_url, fetch_job_description_async,
+                    get_presigned_download_url, parse_range_header, iter_stored_file, generate_profile_picture_renditions,
+                    construct_tailored_job_prompt, construct_single_job_prompt, construct_candidate_profile,
+                    extract_job_id, build_job_context_maps, estimate_queryset_count,
+                    candidate_ranking_feed, feed_jobs)
 from paypalcheckoutsdk.orders import OrdersCreateRequest, OrdersCaptureRequest
 from django.db import transaction
 from rest_framework.generics import ListAPIView
@@ -42,7 +50,9 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 from rest_framework import serializers
-from django.http import FileResponse, Http404
+from django.http import (Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.utils.http import content_disposition_header
 import httpx
 from asgiref.sync import sync_to_async
 from django.contrib.auth.tokens import default_token_generator
@@ -69,6 +79,7 @@ from django.utils.text import slugify
 import random
 import string
 import re
+import hashlib
 from django.core.cache import cache
 
 
@@ -133,16 +144,158 @@ class JobFilter(django_filters.FilterSet):
         return queryset
 
     def filter_search(self, queryset, name, value):
-        value = value.strip().lower()
-        return queryset.filter(
-            Q(title__icontains=value) |
-            Q(description__icontains=value) |
-            Q(company_name__icontains=value) |
-            Q(requirements__icontains=value) |
-            Q(benefits__icontains=value)
+        value = value.strip()
+        if not value:
+            return queryset
+        # Postings are indexed with their own language, so match the query stemmed both ways
+        query = (
+            SearchQuery(value, config='english', search_type='websearch') |
+            SearchQuery(value, config='french', search_type='websearch')
+        )
+        # ts_rank is a float4 that does not round-trip through the cursor's JSON as a double, so the
+        # rank is rounded to a decimal and the feed orders and seeks on that same value
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), DecimalField(max_digits=16, decimal_places=8))
         )
 
 
+class JobKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for the job feed. The queryset is ordered descending on non-null
+    keys ending with id, and each page continues after the last row of the previous one, so deep
+    pages cost the same as the first one. The total count is opt-in through ?count=exact|approximate.
+
+    A list of querysets is read as consecutive segments sharing the keys, each segment sorting
+    entirely after the previous one: the same cursor filter then selects the right rows of each.
+    """
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, keys=('id',), view=None):
+        self.request = request
+        self.keys = list(keys)
+        self.page_size = self.get_page_size(request)
+        self.page_number, values = self.decode_cursor(request)
+        segments = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+        counts = [self.get_count(segment, request.query_params.get(self.count_query_param)) for segment in segments]
+        self.count = None if None in counts else sum(counts)
+
+        results = []
+        for segment in segments:
+            segment = segment.order_by(*[F(key).desc() for key in self.keys])
+            if values is not None:
+                segment = segment.filter(self.get_keyset_filter(values))
+            results += segment[:self.page_size + 1 - len(results)]
+            if len(results) > self.page_size:
+                break
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.last_values = [getattr(results[-1], key) for key in self.keys] if results else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_count(self, queryset, mode):
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'approximate':
+            return estimate_queryset_count(queryset)
+        return None
+
+    def get_keyset_filter(self, values):
+        """
+        Rows strictly after the cursor in (k1 desc, k2 desc, ...) order. The redundant k1 <= v1 bound
+        lets Postgres start the index scan at the cursor instead of filtering from the top.
+        """
+        after = Q()
+        equal = Q()
+        for key, value in zip(self.keys, values):
+            after |= equal & Q(**{f"{key}__lt": value})
+            equal &= Q(**{key: value})
+        return Q(**{f"{self.keys[0]}__lte": values[0]}) & after
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return 0, None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            page_number, values = int(cursor['p']), cursor['v']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return page_number, values
+
+    def encode_cursor(self):
+        cursor = json.dumps({'p': self.page_number + 1, 'v': self.last_values}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor())
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'previous': None, 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class QuerySetChain:
+    """
+    Ordered querysets read back to back and sliced like one queryset, so PageNumberPagination can
+    page across them. A segment is only counted once a page starts past its rows.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self.counts = {}
+
+    def segment_count(self, index):
+        if index not in self.counts:
+            self.counts[index] = self.querysets[index].count()
+        return self.counts[index]
+
+    def count(self):
+        return sum(self.segment_count(index) for index in range(len(self.querysets)))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop = item.start or 0, item.stop
+        results = []
+        for index, queryset in enumerate(self.querysets):
+            if stop is not None and stop <= start:
+                break
+            rows = list(queryset[start:stop])
+            results += rows
+            if rows:
+                # The segment ran out, the rest of the slice starts at the top of the next one
+                stop = None if stop is None else stop - start - len(rows)
+                start = 0
+            else:
+                skipped = self.segment_count(index)
+                start = start - skipped
+                stop = None if stop is None else stop - skipped
+        return results
+
+
 class CandidateJobsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -203,6 +356,12 @@ class CandidateJobsView(APIView):
 
         return results
 
+    def use_cursor_pagination(self, filters):
+        """
+        Infinite scroll opts into keyset pagination with ?pagination=cursor, later pages carry ?cursor=.
+        """
+        return filters.get('pagination') == 'cursor' or bool(filters.get('cursor'))
+
     def save_search_term(self, candidate, search_term):
         """
         Save or update the search term for the candidate.
@@ -211,7 +370,10 @@ class CandidateJobsView(APIView):
             return
 
         # Check if the search term already exists
-        existing_term = SearchTerm.objects.filter(candidate=candidate, term__iexact=search_term).first()
+        # Compared as lower(term), the expression the (candidate, lower(term)) index is built on
+        existing_term = SearchTerm.objects.alias(term_lower=Lower('term')).filter(
+            candidate=candidate, term_lower=Lower(Value(search_term))
+        ).first()
         if existing_term:
             # Update the `last_searched_at` field
             existing_term.last_searched_at = datetime.now()
@@ -224,7 +386,7 @@ class CandidateJobsView(APIView):
         operation_description="Retrieve a list of jobs with optional filters and similarity scores "
                               "for the authenticated candidate.",
         manual_parameters=[
-            openapi.Parameter('sort_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Sort jobs by similarity_score or posted_date (default: posted_date).'),
+            openapi.Parameter('sort_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Sort jobs by similarity_score or posted_date (default: posted_date, or search relevance when searching).'),
             openapi.Parameter('description', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Filter by job description (contains).'),
             openapi.Parameter('company_name', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Filter by company name (contains).'),
             openapi.Parameter('requirements', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Filter by job requirements (contains).'),
@@ -240,6 +402,9 @@ class CandidateJobsView(APIView):
             openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Search across title, description, company name, requirements, and benefits.'),
             openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Page number.'),
             openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Number of items per page.'),
+            openapi.Parameter('pagination', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Set to cursor for keyset pagination (follow the next link instead of page numbers).'),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Opaque cursor from the previous response next link.'),
+            openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Cursor pagination only: exact or approximate total count (omitted by default).'),
         ],
         responses={200: JobSerializer(many=True)},
         security=[{'Bearer': []}]
@@ -256,29 +421,43 @@ class CandidateJobsView(APIView):
         self.save_search_term(candidate, search_term)
 
         # Apply filters for the Job model using the JobFilter
-        job_filter = JobFilter(filters, queryset=Job.objects.all())
+        job_filter = JobFilter(filters, queryset=Job.objects.defer('embedding', 'search_vector'))
         jobs = job_filter.qs
 
-        # Determine sorting criteria
+        # Determine sorting criteria, and the descending keys the cursor pagination seeks on
         sort_by = filters.get('sort_by', 'posted_date').lower()
+        segments = None
         if sort_by == 'similarity_score':
-            jobs = jobs.annotate(
-                similarity_score=Subquery(
-                    JobSearch.objects.filter(
-                        cv__candidate=candidate,
-                        job_id=OuterRef('id')
-                    ).values('similarity_score')[:1]
-                )
-            ).order_by(F('similarity_score').desc(nulls_last=True), F('posted_date').desc(nulls_last=True))
+            # Best score across the candidate's CVs, then the local embedding pre-rank for the jobs
+            # Gemini has not scored yet
+            segments = candidate_ranking_feed(jobs, candidate)
+            keys = ['feed_similarity_score', 'feed_match_score', 'feed_posted_date', 'feed_id']
+            ordering = [F(key).desc() for key in keys]
+        elif search_term and 'sort_by' not in filters:
+            ordering = ['-search_rank', F('posted_date').desc(nulls_last=True), '-id']
+            keys = ['search_rank', 'feed_posted_date', 'id']
         else:
-            jobs = jobs.order_by(F('posted_date').desc(nulls_last=True), '-created_at')
-
-        paginator = self.CustomPagination()
-        paginated_jobs = paginator.paginate_queryset(jobs, request)
+            ordering = [F('posted_date').desc(nulls_last=True), '-created_at']
+            keys = ['feed_posted_date', 'id']
+
+        if self.use_cursor_pagination(filters):
+            if segments is None:
+                # Keys must be non-null for the keyset comparison, missing values sort last as before
+                segments = [jobs.annotate(feed_posted_date=Coalesce('posted_date', Value(Job.FEED_NULL_DATE)))]
+            paginator = JobKeysetPagination()
+            paginated_jobs = feed_jobs(paginator.paginate_queryset(list(segments), request, keys))
+            current_page = paginator.page_number
+        else:
+            paginator = self.CustomPagination()
+            if segments is None:
+                paginated_jobs = paginator.paginate_queryset(jobs.order_by(*ordering), request)
+            else:
+                chain = QuerySetChain(*[segment.order_by(*ordering) for segment in segments])
+                paginated_jobs = feed_jobs(paginator.paginate_queryset(chain, request))
+            current_page = int(request.query_params.get('page', 1)) - 1
 
         # Fetch ads and paginate them
         ads_per_page = self.get_ads_per_page(len(paginated_jobs))  # Dynamically fetch ads per page
-        current_page = int(request.query_params.get('page', 1)) - 1
         ads = list(Ad.objects.filter(is_active=True, ad_type='in_jobs').order_by("-created_at"))
 
         if ads:
@@ -290,32 +469,9 @@ class CandidateJobsView(APIView):
             ads_to_show = []
 
         job_ids = [job.id for job in paginated_jobs]
-        job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=candidate)
-        similarity_scores_map = {}
-        for js in job_searches:
-            job_id = js.job_id
-            if job_id not in similarity_scores_map:
-                similarity_scores_map[job_id] = []
-            similarity_scores_map[job_id].append({
-                'cv_id': js.cv.id,
-                'type': js.cv.cv_type,
-                'score': int(js.similarity_score)
-            })
-
-        applies_map = {js.job_id: js.is_applied for js in job_searches}
-
-        favorites = Favorite.objects.filter(candidate=candidate, job_id__in=job_ids)
-        favorite_jobs_ids = [favorite.job.id for favorite in favorites]
-        favorites_map = {job_id: True if job_id in favorite_jobs_ids else False for job_id in job_ids}
-
         job_serializer = JobSerializer(
             paginated_jobs, many=True,
-            context={
-                'similarity_scores_map': similarity_scores_map,
-                'applies_map': applies_map,
-                'favorites_map': favorites_map,
-                'request': request
-            }
+            context={**build_job_context_maps(candidate, job_ids), 'request': request}
         )
         ad_serializer = AdSerializer(ads_to_show, many=True, context={'request': request})
 
@@ -336,30 +492,9 @@ class JobDetailView(APIView):
     )
     def get(self, request, id):
         try:
-            job = Job.objects.get(id=id)
-            job_ids = [job.id]
-
-            job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=request.user.candidate)
-            similarity_scores_map = {}
-            for js in job_searches:
-                job_id = js.job_id
-                if job_id not in similarity_scores_map:
-                    similarity_scores_map[job_id] = []
-                similarity_scores_map[job_id].append({
-                    'cv_id': js.cv.id,
-                    'type': js.cv.cv_type,
-                    'score': int(js.similarity_score)
-                })
-
-            applies_map = {js.job_id: js.is_applied for js in job_searches}
-
-            favorites = Favorite.objects.filter(job_id__in=job_ids)
-            favorite_jobs_ids = [favorite.job.id for favorite in favorites]
-            favorites_map = {job_id: True if job_id in favorite_jobs_ids else False for job_id in job_ids}
-
-            serializer = JobSerializer(job, context={'similarity_scores_map': similarity_scores_map,
-                                                     'applies_map': applies_map,
-                                                     "favorites_map": favorites_map, 'request': request})
+            job = Job.objects.defer('embedding', 'search_vector').get(id=id)
+            context = build_job_context_maps(request.user.candidate, [job.id])
+            serializer = JobSerializer(job, context={**context, 'request': request})
 
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Job.DoesNotExist:
@@ -426,7 +561,9 @@ class CandidateFavoriteJobsView(APIView):
         candidate = request.user.candidate
 
         # Get favorite jobs for the candidate
-        favorite_jobs = Favorite.objects.filter(candidate=candidate).select_related('job')
+        favorite_jobs = Favorite.objects.filter(candidate=candidate).select_related('job').defer(
+            'job__embedding', 'job__search_vector'
+        )
         jobs = [fav.job for fav in favorite_jobs]
 
         # Apply pagination
@@ -448,31 +585,11 @@ class CandidateFavoriteJobsView(APIView):
 
         job_ids = [job.id for job in paginated_results]
 
-        # Get all JobSearches for the candidate
-        job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=candidate)
-        similarity_scores_map = {}
-        for js in job_searches:
-            job_id = js.job_id
-            if job_id not in similarity_scores_map:
-                similarity_scores_map[job_id] = []
-            similarity_scores_map[job_id].append({
-                'cv_id': js.cv.id,
-                'type': js.cv.cv_type,
-                'score': int(js.similarity_score)
-            })
-
-        applies_map = {js.job_id: js.is_applied for js in job_searches}
-
-        favorites = Favorite.objects.filter(job_id__in=job_ids)
-        favorite_jobs_ids = [favorite.job.id for favorite in favorites]
-        favorites_map = {job_id: True if job_id in favorite_jobs_ids else False for job_id in job_ids}
-
-        # Serialize jobs with similarity score
+        # Serialize jobs with similarity scores, applied and favorite flags
         job_serializer = JobSerializer(
             paginated_results,
             many=True,
-            context={'similarity_scores_map': similarity_scores_map, 'applies_map': applies_map,
-                     "favorites_map": favorites_map, 'request': request}
+            context={**build_job_context_maps(candidate, job_ids), 'request': request}
         )
 
         ad_serializer = AdSerializer(ads_to_show, many=True, context={'request': request})
@@ -578,7 +695,9 @@ class CandidateAppliedJobsView(APIView):
         candidate = request.user.candidate
 
         # Get applied jobs for the candidate
-        applied_job_searches = JobSearch.objects.filter(cv__candidate=candidate, is_applied=True).select_related('job')
+        applied_job_searches = JobSearch.objects.filter(
+            cv__candidate=candidate, is_applied=True
+        ).select_related('job').defer('job__embedding', 'job__search_vector')
         applied_jobs = [js.job for js in applied_job_searches]
 
         # Apply pagination
@@ -600,30 +719,11 @@ class CandidateAppliedJobsView(APIView):
 
         job_ids = [job.id for job in paginated_results]
 
-        # Get similarity scores for the candidate
-        job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=candidate)
-        similarity_scores_map = {}
-        for js in job_searches:
-            job_id = js.job_id
-            if job_id not in similarity_scores_map:
-                similarity_scores_map[job_id] = []
-            similarity_scores_map[job_id].append({
-                'cv_id': js.cv.id,
-                'type': js.cv.cv_type,
-                'score': int(js.similarity_score)
-            })
-        applies_map = {js.job_id: js.is_applied for js in job_searches}
-
-        favorites = Favorite.objects.filter(job_id__in=job_ids)
-        favorite_jobs_ids = [favorite.job.id for favorite in favorites]
-        favorites_map = {job_id: True if job_id in favorite_jobs_ids else False for job_id in job_ids}
-
-        # Serialize jobs with similarity score
+        # Serialize jobs with similarity scores, applied and favorite flags
         job_serializer = JobSerializer(
             paginated_results,
             many=True,
-            context={'similarity_scores_map': similarity_scores_map, 'applies_map': applies_map,
-                     "favorites_map": favorites_map, 'request': request}
+            context={**build_job_context_maps(candidate, job_ids), 'request': request}
         )
 
         ad_serializer = AdSerializer(ads_to_show, many=True, context={'request': request})
@@ -997,7 +1097,7 @@ class UserProfileView(APIView):
         # Retrieve current user profile
         user = request.user
         candidate = get_object_or_404(Candidate, user=user)
-        serializer = CandidateSerializer(candidate)
+        serializer = CandidateSerializer(candidate, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -1025,9 +1125,11 @@ class UserProfileView(APIView):
         # Update current user profile
         user = request.user
         candidate = get_object_or_404(Candidate, user=user)
-        serializer = CandidateSerializer(candidate, data=request.data, partial=False)
+        serializer = CandidateSerializer(candidate, data=request.data, partial=False, context={"request": request})
         if serializer.is_valid():
             serializer.save()
+            if "profile_picture" in request.data:
+                generate_profile_picture_renditions(candidate)
             # Cache invalidation after a successful update
             cache_key = f"candidate_profile_base64_{candidate.id}"
             cache.delete(cache_key)
@@ -1059,9 +1161,11 @@ class UserProfileView(APIView):
         # Partially update current user profile
         user = request.user
         candidate = get_object_or_404(Candidate, user=user)
-        serializer = CandidateSerializer(candidate, data=request.data, partial=True)
+        serializer = CandidateSerializer(candidate, data=request.data, partial=True, context={"request": request})
         if serializer.is_valid():
             serializer.save()
+            if "profile_picture" in request.data:
+                generate_profile_picture_renditions(candidate)
             # Cache invalidation after a successful update
             cache_key = f"candidate_profile_base64_{candidate.id}"
             cache.delete(cache_key)
@@ -1820,7 +1924,7 @@ class LinkedInCVView(APIView):
             return Response({'error': 'Failed to fetch LinkedIn profile data. Try Again Later'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class JobLinkCVView(APIView):
+class JobLinkCVView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -1839,7 +1943,7 @@ class JobLinkCVView(APIView):
             500: openapi.Response(description='Internal Server Error')
         }
     )
-    def post(self, request):
+    async def post(self, request):
         job_link = request.data.get('job_link')
 
         # Validate the job link
@@ -1849,12 +1953,15 @@ class JobLinkCVView(APIView):
         if not is_valid_job_url(job_link):
             return Response({'error': 'Invalid job link or unsupported domain.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch the job description
-        job_description = fetch_job_description(job_link)
+        # Fetch the job description without holding a worker thread
+        job_description = await fetch_job_description_async(job_link)
         if not job_description:
             return Response({'error': 'Failed to fetch job description after multiple retries.'},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        return await sync_to_async(self.tailor_cv)(request, job_link, job_description)
+
+    def tailor_cv(self, request, job_link, job_description):
         # Check candidate credits
         candidate = request.user.candidate
         sufficient, credit_cost = has_sufficient_credits(candidate, 'tailor_cv_from_job_link')
@@ -2022,11 +2129,8 @@ class ExistingJobCVView(APIView):
                 "skills": ', '.join(job.skills_required or [])
             }
             candidate_profile = construct_candidate_profile(base_cv_data)
-            prompt = construct_similarity_prompt(candidate_profile, [job_data])
             try:
-                gemini_response = get_gemini_response(prompt)
-                gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-                score_data = json.loads(gemini_response)[0]
+                score_data = get_similarity_scores(candidate_profile, [job_data])[0]
                 score = score_data.get("score", 0)
             except Exception as e:
                 return Response({'error': f"Failed to fetch score from Gemini: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2900,7 +3004,11 @@ class CandidateCVsView(ListAPIView):
     def get_queryset(self):
         # Retrieve all CVs for the authenticated candidate
         candidate = self.request.user.candidate
-        return CV.objects.filter(candidate=candidate).select_related("cv_data", "job").order_by('-created_at')
+        return CV.objects.filter(candidate=candidate).select_related(
+            "cv_data", "job", "career", "template__abstract_template"
+        ).prefetch_related("career__translations").defer(
+            "job__embedding", "job__search_vector"
+        ).order_by('-created_at')
 
     @swagger_auto_schema(
         operation_description="Retrieve a list of CVs for the authenticated user, with the base CV always appearing first.",
@@ -2926,40 +3034,28 @@ class CandidateCVsView(ListAPIView):
 
         # Retrieve the base CV
         try:
-            base_cv = CV.objects.get(candidate=candidate, cv_type=CV.BASE)
+            base_cv = self.get_queryset().get(cv_type=CV.BASE)
         except CV.DoesNotExist:
             base_cv = None
 
         # Apply filters to the remaining CVs (excluding the base CV)
         queryset = self.filter_queryset(self.get_queryset().exclude(id=base_cv.id if base_cv else None))
 
-        # Extract job IDs for tailored CVs
-        job_ids = list(queryset.exclude(job__isnull=True).values_list("job__id", flat=True))
-
-        # Get similarity scores for related jobs
-        job_searches = JobSearch.objects.filter(job_id__in=job_ids, cv__candidate=candidate)
-        similarity_scores_map = {}
-        for js in job_searches:
-            job_id = js.job_id
-            if job_id not in similarity_scores_map:
-                similarity_scores_map[job_id] = []
-            similarity_scores_map[job_id].append({
-                'cv_id': js.cv.id,
-                'type': js.cv.cv_type,
-                'score': int(js.similarity_score)
-            })
-
         # Combine base CV with the filtered queryset
         if base_cv:
             queryset = [base_cv] + list(queryset)
 
         # Paginate the combined queryset
         page = self.paginate_queryset(queryset)
+        cvs = page if page is not None else queryset
+
+        # Get similarity scores for the jobs of the tailored CVs on this page
+        job_ids = {cv.job_id for cv in cvs if cv.job_id}
+        context = build_job_context_maps(candidate, job_ids, include_favorites=False)
+
+        serializer = CVSerializer(cvs, many=True, context={'request': request, 'similarity_scores_map': context['similarity_scores_map']})
         if page is not None:
-            serializer = CVSerializer(page, many=True, context={'request': request, 'similarity_scores_map': similarity_scores_map})
             return self.get_paginated_response(serializer.data)
-
-        serializer = CVSerializer(queryset, many=True, context={'request': request, 'similarity_scores_map': similarity_scores_map})
         return Response(serializer.data)
 
 
@@ -3041,12 +3137,9 @@ class GetFavoriteScoresView(APIView):
             for job in jobs_to_compare
         ]
 
-        prompt = construct_similarity_prompt(candidate_profile, jobs_data)
-        # Get scores from Gemini
+        # Get scores from the LLM cache or Gemini
         try:
-            gemini_response = get_gemini_response(prompt)
-            gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-            scores = json.loads(gemini_response)
+            scores = get_similarity_scores(candidate_profile, jobs_data)
 
             for score_data in scores:
                 job_id = score_data['id']
@@ -3139,12 +3232,8 @@ class GetJobScoresByIdsView(APIView):
         if not jobs_data:
             return Response({"detail": "All jobs are up-to-date."}, status=status.HTTP_200_OK)
 
-        prompt = construct_similarity_prompt(candidate_profile, jobs_data)
-
         try:
-            gemini_response = get_gemini_response(prompt)
-            gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-            scores = json.loads(gemini_response)
+            scores = get_similarity_scores(candidate_profile, jobs_data)
 
             for score_data in scores:
                 job_id = score_data['id']
@@ -3248,12 +3337,8 @@ class GenerateJobCVScoreView(APIView):
             "requirements": ', '.join(job.requirements or []),
             "skills": ', '.join(job.skills_required or [])
         }
-        prompt = construct_similarity_prompt(candidate_profile, [job_data])
-
         try:
-            gemini_response = get_gemini_response(prompt)
-            gemini_response = (gemini_response.split("```json")[-1]).split("```")[0]
-            score_data = json.loads(gemini_response)[0]
+            score_data = get_similarity_scores(candidate_profile, [job_data])[0]
             score = score_data.get("score")
 
             # Update or create JobSearch instance
@@ -3295,7 +3380,10 @@ class JobClickView(APIView):
             return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Check if the candidate has already clicked this job
-        _, created = JobClick.objects.get_or_create(job=job, candidate=candidate)
+        with transaction.atomic():
+            _, created = JobClick.objects.get_or_create(job=job, candidate=candidate)
+            if created:
+                Job.objects.filter(id=job.id).update(click_count=F('click_count') + 1)
         if created:
             return Response({"detail": "Click tracked successfully."}, status=status.HTTP_200_OK)
         else:
@@ -3728,7 +3816,7 @@ class CVDetailView(APIView):
 
         cv.template = template
         cv.save()
-        generate_cv_pdf(cv)
+        enqueue_cv_render(cv.id)
 
     @swagger_auto_schema(
         operation_description="Delete a CV by ID, including its associated template if present.",
@@ -3761,6 +3849,8 @@ class CVDetailView(APIView):
 class DownloadCVPDFView(APIView):
     """
     API endpoint to download the generated CV PDF.
+    Streams the file from storage in chunks with ETag and Range support, or redirects to a
+    short-lived presigned URL when CV_DOWNLOAD_MODE is "redirect".
     """
     permission_classes = [IsAuthenticated]
 
@@ -3779,6 +3869,10 @@ class DownloadCVPDFView(APIView):
                     description="PDF file of the CV"
                 ),
             ),
+            206: openapi.Response(description="Requested byte range of the PDF."),
+            302: openapi.Response(description="Redirect to a short-lived presigned download URL."),
+            304: openapi.Response(description="Not Modified - the PDF matches the If-None-Match ETag."),
+            416: openapi.Response(description="Requested range not satisfiable."),
             400: openapi.Response(
                 description="Bad Request - PDF not generated for this CV.",
                 examples={"application/json": {"error": "PDF not generated for this CV."}}
@@ -3798,11 +3892,50 @@ class DownloadCVPDFView(APIView):
             if not cv.generated_pdf:
                 return Response({"error": "PDF not generated for this CV."}, status=400)
 
-            file_path = cv.generated_pdf.path
-            if not os.path.exists(file_path):
-                raise Http404("File not found")
+            filename = f"{cv.name}.pdf"
+            if settings.CV_DOWNLOAD_MODE == "redirect":
+                download_url = get_presigned_download_url(cv.generated_pdf.name, filename)
+                if download_url:
+                    return HttpResponseRedirect(download_url)
 
-            return FileResponse(open(file_path, "rb"), as_attachment=True, filename=f"{cv.name}.pdf")
+            # Stored files are named after their render fingerprint, so it doubles as a strong ETag
+            etag = f'"{cv.render_fingerprint or hashlib.md5(cv.generated_pdf.name.encode()).hexdigest()}"'
+            if_none_match = request.headers.get("If-None-Match", "")
+            if if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+
+            try:
+                stored_file = cv.generated_pdf.storage.open(cv.generated_pdf.name, "rb")
+            except FileNotFoundError:
+                raise Http404("File not found")
+            size = stored_file.size
+
+            byte_range = None
+            if_range = request.headers.get("If-Range")
+            if not if_range or if_range == etag:
+                byte_range = parse_range_header(request.headers.get("Range"), size)
+            if byte_range and byte_range[0] >= size:
+                stored_file.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+            start, end = byte_range or (0, size - 1)
+            response = StreamingHttpResponse(
+                iter_stored_file(stored_file, start, end),
+                status=206 if byte_range else 200,
+                content_type="application/pdf",
+            )
+            response["Content-Length"] = str(max(0, end - start + 1))
+            if byte_range:
+                response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Accept-Ranges"] = "bytes"
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+            return response
 
         except CV.DoesNotExist:
             return Response({"error": "CV not found"}, status=404)
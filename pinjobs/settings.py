@@ -24,6 +24,8 @@ load_dotenv()
 EXTERNAL_API_URL = os.getenv('EXTERNAL_API_URL')
 PROXYCURL_API_KEY = os.getenv('PROXYCURL_API_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))  # Parallel Gemini calls allowed from async code
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60))  # Shared budget for background scoring
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -247,6 +249,14 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 CELERY_TIMEZONE = 'UTC'
+SCRAPING_CONCURRENCY = int(os.getenv('SCRAPING_CONCURRENCY', 4))  # Parallel combination scraping workers per run
+CHROME_POOL_SIZE = int(os.getenv('CHROME_POOL_SIZE', 2))  # Warm headless Chrome instances per process for PDF rendering
+CHROME_POOL_WARM_ON_BOOT = os.getenv('CHROME_POOL_WARM_ON_BOOT', 'False') == 'True'
+CV_RENDER_BACKEND = os.getenv('CV_RENDER_BACKEND', 'chrome')  # 'chrome' (frontend preview) or 'native' (server-side HTML)
+CV_THUMBNAIL_PRESET = os.getenv('CV_THUMBNAIL_PRESET', 'medium')  # Key of CV_THUMBNAIL_PRESETS
+CV_THUMBNAIL_FORMAT = os.getenv('CV_THUMBNAIL_FORMAT', 'webp')  # 'webp' or 'jpeg'
+CV_THUMBNAIL_WORKERS = int(os.getenv('CV_THUMBNAIL_WORKERS', 2))  # Processes building thumbnails
+CV_DOWNLOAD_MODE = os.getenv('CV_DOWNLOAD_MODE', 'stream')  # 'stream' through the API or 'redirect' to a presigned URL
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -269,6 +279,19 @@ CHANNEL_LAYERS = {
     },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # LLM responses keyed by content hash and the Gemini rate limit counters, shared by every web
+    # and Celery process through the broker's Redis unless LLM_CACHE_REDIS_URL points elsewhere
+    "llm": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("LLM_CACHE_REDIS_URL", CELERY_BROKER_URL),
+    },
+}
+SIMILARITY_SCORE_CACHE_TIMEOUT = int(os.getenv('SIMILARITY_SCORE_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
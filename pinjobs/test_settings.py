@@ -0,0 +1,56 @@
+"""
+Settings for the test suite: a local PostgreSQL (the search vector and ranking triggers, GIN and
+expression indexes need it) instead of the hosted database, and in-process stand-ins for Redis,
+Celery and S3.
+
+    TEST_DB_HOST=localhost TEST_DB_USER=postgres TEST_DB_PASSWORD=postgres \
+        python manage.py test candidates --settings=pinjobs.test_settings
+
+The user needs the CREATEDB privilege: Django creates and drops test_<TEST_DB_NAME> itself.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('TEST_DB_NAME', 'pinjobs'),
+        'USER': os.getenv('TEST_DB_USER', 'postgres'),
+        'PASSWORD': os.getenv('TEST_DB_PASSWORD', 'postgres'),
+        'HOST': os.getenv('TEST_DB_HOST', 'localhost'),
+        'PORT': os.getenv('TEST_DB_PORT', '5432'),
+    }
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "llm": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "llm",
+    },
+}
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.InMemoryStorage"
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    }
+}
+DEFAULT_FILE_STORAGE = 'django.core.files.storage.InMemoryStorage'
+
+CHROME_POOL_WARM_ON_BOOT = False
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']